@@ -0,0 +1,102 @@
+import hashlib, json, os, sqlite3, time
+from typing import Dict, Iterator, Optional
+
+
+# ---------------- ARTICLE STORE ----------------
+class ArticleStore:
+    """
+    Local SQLite store of fetched articles indexed by (source, eid), with fetch time and content hash.
+    Re-runs only fetch articles that are missing or older than `max_age_days`, and record whether they changed.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    source       TEXT NOT NULL,
+                    eid          TEXT NOT NULL,
+                    headword     TEXT,
+                    body         TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    fetched_at   REAL NOT NULL,
+                    updated_at   REAL NOT NULL,
+                    PRIMARY KEY (source, eid)
+                )
+            """)
+
+    def needs_fetch(self, source: str, eid: str, max_age_days: Optional[float] = None) -> bool:
+        row = self._conn.execute(
+            "SELECT fetched_at FROM articles WHERE source = ? AND eid = ?", (source, eid)
+        ).fetchone()
+        if row is None:
+            return True
+        return max_age_days is not None and time.time() - row[0] > max_age_days * 86400
+
+    def upsert(self, source: str, eid: str, article: Dict) -> str:
+        # Returns "new", "changed" or "unchanged"
+        now = time.time()
+        digest = content_hash(article)
+        row = self._conn.execute(
+            "SELECT content_hash FROM articles WHERE source = ? AND eid = ?", (source, eid)
+        ).fetchone()
+        with self._conn:
+            if row is None:
+                status = "new"
+                self._conn.execute(
+                    "INSERT INTO articles (source, eid, headword, body, content_hash, fetched_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (source, eid, article.get("headword"), article["body"], digest, now, now),
+                )
+            elif row[0] != digest:
+                status = "changed"
+                self._conn.execute(
+                    "UPDATE articles SET headword = ?, body = ?, content_hash = ?, fetched_at = ?, updated_at = ? WHERE source = ? AND eid = ?",
+                    (article.get("headword"), article["body"], digest, now, now, source, eid),
+                )
+            else:
+                status = "unchanged"
+                self._conn.execute(
+                    "UPDATE articles SET fetched_at = ? WHERE source = ? AND eid = ?",
+                    (now, source, eid),
+                )
+        return status
+
+    def iter_articles(self, source: Optional[str] = None) -> Iterator[Dict]:
+        query = "SELECT source, eid, headword, body, content_hash FROM articles"
+        params = ()
+        if source is not None:
+            query += " WHERE source = ?"
+            params = (source,)
+        for source, eid, headword, body, digest in self._conn.execute(query + " ORDER BY source, eid", params):
+            yield {
+                "source": source,
+                "eid": eid,
+                "headword": headword,
+                "body": body,
+                "content_hash": digest,
+            }
+
+    def export_json(self, dst_path: str) -> int:
+        # Stream every article into a single JSON array, the format extract_data reads
+        count = 0
+        tmp_path = f"{dst_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as dst_file:
+            dst_file.write("[")
+            for article in self.iter_articles():
+                dst_file.write(",\n    " if count else "\n    ")
+                dst_file.write(json.dumps(article, ensure_ascii=False))
+                count += 1
+            dst_file.write("\n]\n")
+        os.replace(tmp_path, dst_path)
+        return count
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+# ---------------- UTILS ----------------
+def content_hash(article: Dict) -> str:
+    text = f"{article.get('headword') or ''}\n{article['body']}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
@@ -1,73 +1,105 @@
-import json, requests, pandas as pd
-from tqdm import tqdm
+import csv
+from collections import Counter
+from openpyxl import load_workbook
+from typing import Callable, Dict, Iterator, List, Optional
+
+from article_store import ArticleStore
+from fetch_engine import FetchEngine
 
 
 # ---------------- SCRAPE DATA ----------------
-def fetch_from_encykorea(src_path: str, dst_path: str, keywords: list[str], API_KEY: str, ENDPOINT_URL: str) -> None:
+def fetch_from_encykorea(src_path: str, store: ArticleStore, keywords: list[str], API_KEY: str, ENDPOINT_URL: str, engine: Optional[FetchEngine] = None, max_age_days: Optional[float] = None) -> Counter:
+    engine = engine or FetchEngine()
     headers = { "X-API-Key": API_KEY }
-    fetched = []
+    statuses = Counter()
 
-    if src_path.endswith(".csv"):
-        df = pd.read_csv(src_path, header=None, dtype=str, encoding="utf-8")
-    else:
-        df = pd.read_excel(src_path, header=None, dtype=str, encoding="utf-8")
-    
-    for _, row in tqdm(df.iterrows(), total=len(df), desc="Fetching data from Encyclopedia of Korean Culture"):
-        line = ",".join(map(str, row.values))
-        eid = get_eid_from_line(line, keywords)
-        if eid is None:
-            continue
-        response = requests.get(url=ENDPOINT_URL+eid, headers=headers, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        
-        article = data.get("article")
-        fetched.append({
-            "headword": article.get("headword"),
-            "body": article.get("body").replace('\r', '').split('\n', 1)[1].strip(),
-        })
-
-    with open(dst_path, "a", encoding="utf-8") as dst_file:
-        json.dump(fetched, dst_file, ensure_ascii=False, indent=4)
+    # Matching EIDs stream straight from the index file into the fetch queue; stored, fresh ones are skipped
+    jobs = (
+        (eid, ENDPOINT_URL+eid, None)
+        for eid in iter_eids(src_path, keywords)
+        if store.needs_fetch("encykorea", eid, max_age_days)
+    )
+    for eid, data in engine.fetch_all(jobs, headers=headers, desc="Fetching data from Encyclopedia of Korean Culture"):
+        store_article(store, "encykorea", eid, data, parse_encykorea, statuses)
+    return statuses
 
 # TODO: Check the parameters needed for the KHS API
-def fetch_from_heritage(src_path: str, dst_path:str, keywords: list[str], API_KEY: str, ENDPOINT_URL: str) -> None:
+def fetch_from_heritage(src_path: str, store: ArticleStore, keywords: list[str], API_KEY: str, ENDPOINT_URL: str, engine: Optional[FetchEngine] = None, max_age_days: Optional[float] = None) -> Counter:
+    engine = engine or FetchEngine()
     headers = { "X-API-Key": API_KEY }
-    fetched = []
+    statuses = Counter()
+
+    # Matching EIDs stream straight from the index file into the fetch queue; stored, fresh ones are skipped
+    jobs = (
+        (eid, ENDPOINT_URL, heritage_params(eid))
+        for eid in iter_eids(src_path, keywords)
+        if store.needs_fetch("heritage", eid, max_age_days)
+    )
+    for eid, data in engine.fetch_all(jobs, headers=headers, desc="Fetching data from Korea Heritage Service"):
+        store_article(store, "heritage", eid, data, parse_heritage, statuses)
+    return statuses
+
+def store_article(store: ArticleStore, source: str, eid: str, data: Dict, parse: Callable[[Dict], Dict], statuses: Counter) -> None:
+    # A malformed response (missing article/content, body without a header line) skips only that article
+    try:
+        article = parse(data)
+    except (AttributeError, IndexError, KeyError, TypeError) as e:
+        statuses["failed"] += 1
+        print(f"⚠️ Warning: could not parse {source} article {eid}: {type(e).__name__}: {e}")
+        return
+    statuses[store.upsert(source, eid, article)] += 1
+
+
+# ---------------- PARSE RESPONSES ----------------
+def parse_encykorea(data: Dict) -> Dict:
+    article = data.get("article")
+    return {
+        "headword": article.get("headword"),
+        "body": article.get("body").replace('\r', '').split('\n', 1)[1].strip(),
+    }
+
+def heritage_params(eid: str) -> Dict:
+    return {
+        "ccbaKdcd": "[Enter field id]",
+        "ccbaAsno": eid,
+        "ccbaCtcd": "[Enter region id]",
+    }
+
+def parse_heritage(data: Dict) -> Dict:
+    return {
+        "headword": data.get("ccbaAsno"),
+        "body": data.get("content").replace('\r', '').split('\n', 1)[1].strip(),
+    }
+
+
+# ---------------- READ INDEX ----------------
+def iter_eids(src_path: str, keywords: list[str], field_col: int = 1, url_col: int = -1) -> Iterator[str]:
+    # Yield the EID of every index row whose field column matches a keyword, one row at a time
+    for row in iter_rows(src_path):
+        eid = get_eid_from_row(row, keywords, field_col, url_col)
+        if eid:
+            yield eid
 
+def iter_rows(src_path: str) -> Iterator[List[str]]:
     if src_path.endswith(".csv"):
-        df = pd.read_csv(src_path, header=None, dtype=str, encoding="utf-8")
+        # csv.reader keeps quoted fields containing commas intact
+        with open(src_path, "r", newline="", encoding="utf-8-sig") as src_file:
+            yield from csv.reader(src_file)
     else:
-        df = pd.read_excel(src_path, header=None, dtype=str, encoding="utf-8")
-    
-    for _, row in tqdm(df.iterrows(), total=len(df), desc="Fetching data from Korea Heritage Service"):
-        line = ",".join(map(str, row.values))
-        eid = get_eid_from_line(line, keywords)
-        if eid is None:
-            continue
-        params = {
-            "ccbaKdcd": "[Enter field id]",
-            "ccbaAsno": eid,
-            "ccbaCtcd": "[Enter region id]",
-        }
-        response = requests.get(url=ENDPOINT_URL, params=params, headers=headers, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        
-        fetched.append({
-            "headword": data.get("ccbaAsno"),
-            "body": data.get("content").replace('\r', '').split('\n', 1)[1].strip(),
-        })
-
-    with open(dst_path, "a", encoding="utf-8") as dst_file:
-        json.dump(fetched, dst_file, ensure_ascii=False, indent=4)
+        workbook = load_workbook(src_path, read_only=True, data_only=True)
+        try:
+            for row in workbook.active.iter_rows(values_only=True):
+                yield ["" if value is None else str(value) for value in row]
+        finally:
+            workbook.close()
 
 
 # ---------------- UTILS ----------------
-def get_eid_from_line(line: str, keywords: list[str]) -> str:
-    parts = line.strip().split(",")
-    field = parts[1]
-    url = parts[-1]
+def get_eid_from_row(row: List[str], keywords: list[str], field_col: int = 1, url_col: int = -1) -> Optional[str]:
+    if len(row) <= field_col:
+        return None
+    field = row[field_col]
+    url = row[url_col]
     if any(keyword in field for keyword in keywords):
         return url.strip().split("/")[-1]
     return None
\ No newline at end of file
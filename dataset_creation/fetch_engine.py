@@ -0,0 +1,118 @@
+import threading, time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Hashable, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from tqdm import tqdm
+
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+# ---------------- FETCH ENGINE ----------------
+class FetchEngine:
+    """
+    Pooled HTTP client for bulk API fetching: one shared `requests.Session`, bounded concurrency,
+    per-host rate limiting, and retry with exponential backoff on 429/5xx and connection errors.
+    """
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None, max_workers: int = 8, requests_per_second: Optional[float] = 5.0, max_retries: int = 5, backoff_factor: float = 0.5, timeout: float = 30) -> None:
+        self.max_workers = max_workers
+        self.requests_per_second = requests_per_second
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        # Retries happen in get_json, not in urllib3, so every attempt goes through the host's rate limiter
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._limiters: Dict[str, HostRateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get_json(self, url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> Any:
+        for attempt in range(self.max_retries + 1):
+            self._limiter(url).wait()
+            try:
+                response = self.session.get(url=url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                time.sleep(self._backoff(attempt, response.headers.get("Retry-After")))
+                continue
+            response.raise_for_status()
+            return response.json()
+
+    def fetch_all(self, jobs: Iterable[Tuple[Hashable, str, Optional[Dict[str, Any]]]], headers: Optional[Dict[str, str]] = None, desc: str = "Fetching", total: Optional[int] = None) -> Iterator[Tuple[Hashable, Any]]:
+        """
+        Fetch `(key, url, params)` jobs concurrently and yield `(key, json)` in job order.
+        Jobs are consumed lazily, so `jobs` can be a generator; failed jobs are reported and skipped.
+        """
+        failed = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool, tqdm(total=total, desc=desc) as pbar:
+            pending = deque()
+
+            def drain_one():
+                nonlocal failed
+                key, url, future = pending.popleft()
+                pbar.update(1)
+                try:
+                    return key, future.result()
+                except (requests.RequestException, ValueError) as e:
+                    failed += 1
+                    print(f"⚠️ Warning: failed to fetch {url}: {e}")
+                    return None
+
+            for key, url, params in jobs:
+                pending.append((key, url, pool.submit(self.get_json, url, params, headers)))
+                if len(pending) >= 2 * self.max_workers:
+                    result = drain_one()
+                    if result is not None:
+                        yield result
+            while pending:
+                result = drain_one()
+                if result is not None:
+                    yield result
+        if failed:
+            print(f"⚠️ {failed} requests failed after retries.")
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        # Honour a numeric Retry-After, otherwise back off exponentially
+        if retry_after and retry_after.strip().isdigit():
+            return float(retry_after)
+        return self.backoff_factor * 2 ** attempt
+
+    def _limiter(self, url: str) -> "HostRateLimiter":
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._limiters:
+                self._limiters[host] = HostRateLimiter(self.requests_per_second)
+            return self._limiters[host]
+
+
+class HostRateLimiter:
+    # Spaces request starts at least 1/rate seconds apart
+    def __init__(self, rate: Optional[float]) -> None:
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
@@ -1,7 +1,9 @@
 import os
 from dotenv import load_dotenv
 
+from article_store import ArticleStore
 from fetch_data import fetch_from_encykorea, fetch_from_heritage
+from fetch_engine import FetchEngine
 
 
 # ---------------- CONFIG ----------------
@@ -12,6 +14,13 @@ ENCYKOREA_ENDPOINT = os.getenv("ENCYKOREA_ENDPOINT_ARTICLE")
 HERITAGE_API_KEY = os.getenv("HERITAGE_API_KEY")
 HERITAGE_ENDPOINT = os.getenv("HERITAGE_ENDPOINT")
 
+FETCH_WORKERS = 8                # concurrent requests
+FETCH_REQUESTS_PER_SECOND = 5.0  # per API host
+FETCH_MAX_RETRIES = 5
+
+STORE_PATH = "example/data/articles.sqlite"
+REFRESH_AFTER_DAYS = None   # refetch stored articles older than this to pick up edits; None fetches only missing ones
+
 
 # ---------------- MAIN ----------------
 def main():
@@ -23,11 +32,22 @@ def main():
         print(f"❗ Source file {src_path} not found. Please provide a valid source file.")
         return
     
+    engine = FetchEngine(max_workers=FETCH_WORKERS, requests_per_second=FETCH_REQUESTS_PER_SECOND, max_retries=FETCH_MAX_RETRIES)
+    store = ArticleStore(STORE_PATH)
+
     print("🔄 Fetching data from Encyclopedia of Korean Culture...")
-    fetch_from_encykorea(src_path, dst_path, keywords, ENCYKOREA_API_KEY, ENCYKOREA_ENDPOINT)
+    statuses = fetch_from_encykorea(src_path, store, keywords, ENCYKOREA_API_KEY, ENCYKOREA_ENDPOINT, engine, REFRESH_AFTER_DAYS)
+    print(f"   {statuses['new']} new, {statuses['changed']} changed, {statuses['unchanged']} unchanged, {statuses['failed']} failed to parse")
 
     print("🔄 Fetching data from Korea Heritage Service...")
-    fetch_from_heritage(src_path, dst_path, HERITAGE_API_KEY, HERITAGE_ENDPOINT)
+    statuses = fetch_from_heritage(src_path, store, keywords, HERITAGE_API_KEY, HERITAGE_ENDPOINT, engine, REFRESH_AFTER_DAYS)
+    print(f"   {statuses['new']} new, {statuses['changed']} changed, {statuses['unchanged']} unchanged, {statuses['failed']} failed to parse")
+
+    engine.close()
+
+    count = store.export_json(dst_path)
+    store.close()
+    print(f"💾 Exported {count} stored articles to {dst_path}")
 
     print("✅ Data fetching complete.")
 
@@ -1,7 +1,11 @@
-import json, os, requests
+import json, os, requests, sys, threading
 from dotenv import load_dotenv
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from tqdm import tqdm
 
+from fetch_data import parse_encykorea
+from fetch_engine import FetchEngine
+
 
 # ---------------- CONFIG ----------------
 load_dotenv()
@@ -39,8 +43,57 @@ def fetch_from_encykorea(eids: list[str], dst_path: str, API_KEY: str) -> None:
         json.dump(fetched, dst_file, ensure_ascii=False, indent=4)
 
 
+# ---------------- STUB SERVER ----------------
+class StubArticleHandler(BaseHTTPRequestHandler):
+    # Serves fake Encyclopedia articles; every EID fails once with 429 to exercise retries
+    throttled = set()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        eid = self.path.rstrip("/").split("/")[-1]
+        with self.lock:
+            first_hit = eid not in self.throttled
+            self.throttled.add(eid)
+        if first_hit:
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+        body = json.dumps({
+            "article": {"headword": f"표제어 {eid}", "body": f"{eid}\r\n본문 {eid}"},
+        }, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def test_fetch_engine_with_stub() -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubArticleHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}/article/"
+    eids = [f"E{i:07d}" for i in range(50)]
+
+    engine = FetchEngine(max_workers=8, requests_per_second=200, backoff_factor=0)
+    jobs = ((eid, endpoint+eid, None) for eid in eids)
+    fetched = [(eid, parse_encykorea(data)) for eid, data in engine.fetch_all(jobs, desc="Fetching from stub server", total=len(eids))]
+    engine.close()
+    server.shutdown()
+
+    assert [eid for eid, _ in fetched] == eids, "results must come back in job order"
+    assert all(article["body"] == f"본문 {eid}" for eid, article in fetched)
+    print(f"✅ Fetched {len(fetched)} articles from the stub server (each retried once after 429).")
+
+
 # ---------------- MAIN ----------------
 def main():
+    if "--stub" in sys.argv:
+        test_fetch_engine_with_stub()
+        return
+
     eids = ["E0020370"]
     dst_path = "data/fetched.json"
     
@@ -0,0 +1,126 @@
+import json, os, time
+import numpy as np
+from dotenv import load_dotenv
+from typing import Dict, List, Tuple
+
+from neo4j_graphrag.embeddings.openai import OpenAIEmbeddings
+
+from embed_entities import embed_with_store, entity_embed_text
+from embedding_store import EmbeddingStore, quantize_int8, reduce_dims
+
+
+# ---------------- CONFIG ----------------
+load_dotenv()
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+EMBED_MODEL = "text-embedding-3-large"
+EMBED_STORE_PATH = "example/data/embeddings.sqlite"
+
+DIMS = [3072, 1536, 1024, 512, 256]   # candidate sizes, all derived from full vectors; max(DIMS) is EMBED_MODEL's full size
+STORAGES = ["float32", "int8"]
+TOP_K = [1, 5, 10]
+REPEATS = 20                          # timing repetitions per query
+
+
+# ---------------- BENCHMARK ----------------
+def benchmark(corpus: np.ndarray, queries: np.ndarray, dims: List[int], storages: List[str], top_k: List[int], repeats: int = 20) -> List[Dict]:
+    """
+    Recall@k of each (dims, storage) variant against exact full-size float32 search,
+    plus per-query brute-force scoring latency and bytes per stored vector.
+    """
+    baseline = top_indices(corpus, queries, max(top_k))
+    results = []
+    for d in dims:
+        q = reduce_dims(queries, d)
+        for storage in storages:
+            if storage == "float32":
+                mat = reduce_dims(corpus, d)
+                bytes_per_vector = d * 4
+            elif storage == "int8":
+                mat = np.stack([np.frombuffer(quantize_int8(v), dtype=np.int8) for v in reduce_dims(corpus, d)])
+                bytes_per_vector = d
+            else:
+                raise ValueError(f"Unsupported storage: {storage}")
+
+            found = top_indices(mat, q, max(top_k))
+            recall = {
+                k: float(np.mean([len(set(found[i, :k]) & set(baseline[i, :k])) / k for i in range(len(q))]))
+                for k in top_k
+            }
+            results.append({
+                "dims": d,
+                "storage": storage,
+                "bytes_per_vector": bytes_per_vector,
+                "latency_ms": score_latency(mat, q, repeats) * 1000,
+                **{f"recall@{k}": r for k, r in recall.items()},
+            })
+    return results
+
+def top_indices(mat: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    mat = np.asarray(mat, dtype=np.float32)
+    norms = np.linalg.norm(mat, axis=1)
+    sims = (queries @ mat.T) / np.where(norms == 0, 1.0, norms)
+    return np.argsort(-sims, axis=1, kind="stable")[:, :k]
+
+def score_latency(mat: np.ndarray, queries: np.ndarray, repeats: int) -> float:
+    # Mean seconds to score one query against every node, as the reranker does per candidate set
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for q in queries:
+            vectors = np.asarray(mat, dtype=np.float32)
+            sims = (vectors @ q) / np.linalg.norm(vectors, axis=1).clip(min=1e-12)
+            np.argpartition(-sims, min(10, len(sims) - 1))
+    return (time.perf_counter() - start) / (repeats * len(queries))
+
+
+# ---------------- DATA ----------------
+def load_vectors(embedder: OpenAIEmbeddings, store: EmbeddingStore, texts: List[str], dims: int) -> np.ndarray:
+    # Full-size vectors, from the store when cached; smaller sizes are truncations of these.
+    # `dims` is explicit so corpus and queries match even if the graph was built with reduced EMBED_DIMS
+    # (smaller stored vectors are then re-fetched at full size)
+    vectors: List = [None] * len(texts)
+    for indices, embeds in embed_with_store(embedder, texts, store, dimensions=dims):
+        for i, vector in zip(indices, embeds):
+            vectors[i] = vector
+    return reduce_dims(np.asarray(vectors, dtype=np.float32), len(vectors[0]))
+
+def load_texts(extracted_path: str, output_path: str) -> Tuple[List[str], List[str]]:
+    # Corpus: every entity as embedded at build time; queries: captions from a previous run
+    with open(extracted_path, "r", encoding="utf-8") as file:
+        entities = json.load(file)["entities"]
+    with open(output_path, "r", encoding="utf-8") as file:
+        outputs = json.load(file)
+    captions = list(dict.fromkeys(qa["caption"] for item in outputs for qa in item["output"] if qa.get("caption")))
+    return [entity_embed_text(entity) for entity in entities], captions
+
+
+# ---------------- MAIN ----------------
+def main():
+    extracted_path = "example/data/extracted.json"
+    output_path = "example/output_top_5.json"
+    dst_path = "example/data/embedding_benchmark.json"
+
+    for path in (extracted_path, output_path):
+        if not os.path.exists(path):
+            print(f"❗ Source file {path} not found. Please provide a valid source file.")
+            return
+
+    embedder = OpenAIEmbeddings(model=EMBED_MODEL, api_key=OPENAI_API_KEY)
+    store = EmbeddingStore(EMBED_STORE_PATH)
+    corpus_texts, query_texts = load_texts(extracted_path, output_path)
+    corpus = load_vectors(embedder, store, corpus_texts, max(DIMS))
+    queries = load_vectors(embedder, store, query_texts, max(DIMS))
+    store.close()
+
+    print(f"📏 {len(corpus)} entities, {len(queries)} caption queries")
+    results = benchmark(corpus, queries, DIMS, STORAGES, TOP_K, REPEATS)
+    for row in results:
+        recalls = "  ".join(f"R@{k}={row[f'recall@{k}']:.3f}" for k in TOP_K)
+        print(f"  {row['dims']:>5}d {row['storage']:<7} {row['bytes_per_vector']:>6} B/vec  {row['latency_ms']:.3f} ms/query  {recalls}")
+
+    with open(dst_path, "w", encoding="utf-8") as file:
+        json.dump(results, file, ensure_ascii=False, indent=4)
+
+
+if __name__ == "__main__":
+    main()
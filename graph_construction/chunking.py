@@ -0,0 +1,141 @@
+import re
+from functools import lru_cache, partial
+from typing import Callable, List
+
+
+Chunker = Callable[[str], List[str]]
+
+# Sentence ends: terminal punctuation (plus closing quotes/brackets) followed by whitespace, or a blank line;
+# only the whitespace (group 1 / group 2) is cut, the punctuation stays with its sentence
+SENTENCE_END = re.compile(r'[.!?。！？]["\'”’)\]]*(\s+)|(\n\s*\n)')
+
+
+# ---------------- CHUNKERS ----------------
+def fixed_chunks(text: str, chunk_size: int = 512) -> List[str]:
+    # Legacy fixed-width character windows
+    return [
+        text[i : i + chunk_size]
+        for i in range(0, len(text), chunk_size)
+    ]
+
+def sentence_chunks(text: str, max_tokens: int = 1500, overlap_tokens: int = 100) -> List[str]:
+    """
+    Pack whole sentences into chunks of at most `max_tokens`, starting each chunk
+    with up to `overlap_tokens` worth of trailing sentences from the previous one.
+    """
+    sentences = []
+    for sentence in split_sentences(text):
+        sentences.extend(split_long(sentence, max_tokens))
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    fresh = False   # whether `current` holds anything beyond the carried-over overlap
+    for sentence in sentences:
+        tokens = count_tokens(sentence)
+        if current and current_tokens + tokens > max_tokens:
+            if fresh:
+                chunks.append(" ".join(current))
+            current, current_tokens = overlap_tail(current, overlap_tokens, max_tokens - tokens)
+            fresh = False
+        current.append(sentence)
+        current_tokens += tokens
+        fresh = True
+    if current and fresh:
+        chunks.append(" ".join(current))
+    return chunks
+
+CHUNKERS = {
+    "fixed": fixed_chunks,
+    "sentence": sentence_chunks,
+}
+
+def get_chunker(name: str, max_tokens: int = 1500, overlap_tokens: int = 100) -> Chunker:
+    # Translate the shared token budget into each chunker's own arguments
+    if name == "fixed":
+        # ~1 token per Hangul char, so max_tokens characters stays within the budget; no overlap
+        return partial(fixed_chunks, chunk_size=max_tokens)
+    if name == "sentence":
+        return partial(sentence_chunks, max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+    raise ValueError(f"Unsupported chunker: {name}")
+
+
+# ---------------- UTILS ----------------
+def split_sentences(text: str) -> List[str]:
+    sentences, start = [], 0
+    for m in SENTENCE_END.finditer(text):
+        gap = 1 if m.group(1) is not None else 2
+        sentences.append(text[start : m.start(gap)])
+        start = m.end(gap)
+    sentences.append(text[start:])
+    return [s.strip() for s in sentences if s.strip()]
+
+def split_long(sentence: str, max_tokens: int) -> List[str]:
+    # Hard-wrap a sentence that alone exceeds the budget, preferring whitespace boundaries
+    if count_tokens(sentence) <= max_tokens:
+        return [sentence]
+    pieces, rest = [], sentence
+    while count_tokens(rest) > max_tokens:
+        cut = max(1, len(rest) * max_tokens // count_tokens(rest))
+        space = rest.rfind(" ", 0, cut)
+        if space > cut // 2:
+            cut = space
+        pieces.append(rest[:cut].strip())
+        rest = rest[cut:].strip()
+    if rest:
+        pieces.append(rest)
+    return [p for p in pieces if p]
+
+def overlap_tail(sentences: List[str], overlap_tokens: int, room: int):
+    tail: List[str] = []
+    tokens = 0
+    for sentence in reversed(sentences):
+        n = count_tokens(sentence)
+        if tokens + n > min(overlap_tokens, room):
+            break
+        tail.insert(0, sentence)
+        tokens += n
+    return tail, tokens
+
+def count_tokens(text: str) -> int:
+    encoding = get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return estimate_tokens(text)
+
+def estimate_tokens(text: str) -> int:
+    # Rough budget: ~4 ASCII chars per token, ~1 token per Hangul/CJK char
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+@lru_cache(maxsize=1)
+def get_encoding():
+    # tiktoken is optional; fall back to the character heuristic without it
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+# ---------------- CHECK ----------------
+def check_chunkers(max_tokens: int = 40, overlap_tokens: int = 10) -> None:
+    # Run every chunker through get_chunker, as main.py builds it, on a mixed Korean/English passage with quotes and brackets
+    text = " ".join(
+        f"{i}번째 문장은 까치와 호랑이에 관한 이야기이다. Sentence {i} describes the magpie and the tiger."
+        f' The tiger said "I am king {i}." Then (it left.) [The magpie stayed.]'
+        for i in range(20)
+    )
+    for name in CHUNKERS:
+        chunks = get_chunker(name, max_tokens=max_tokens, overlap_tokens=overlap_tokens)(text)
+        assert chunks, f"{name}: no chunks"
+        assert all(count_tokens(c) <= max_tokens for c in chunks), f"{name}: chunk over {max_tokens} tokens"
+        covered = "".join(chunks) == text if name == "fixed" else all(any(s in c for c in chunks) for s in split_sentences(text))
+        assert covered, f"{name}: text lost"
+        print(f"✅ {name}: {len(chunks)} chunks, max {max(count_tokens(c) for c in chunks)} tokens")
+    # Without overlap, sentence chunks must reproduce the text exactly, closing quotes and brackets included
+    assert " ".join(sentence_chunks(text, max_tokens, 0)) == text, "sentence: text changed"
+
+
+if __name__ == "__main__":
+    check_chunkers()
@@ -0,0 +1,78 @@
+import random, threading, time
+from collections import deque
+from typing import Callable, Optional, TypeVar
+
+import openai
+
+
+T = TypeVar("T")
+
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+# ---------------- RATE LIMIT ----------------
+class RateLimiter:
+    """
+    Thread-safe sliding one-minute budget for requests and (estimated) tokens.
+    `acquire()` blocks until the call fits in both budgets; `None` disables a budget.
+    """
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None) -> None:
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._events = deque()
+        self._tokens = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._events and now - self._events[0][0] >= 60.0:
+                    _, used = self._events.popleft()
+                    self._tokens -= used
+                fits_requests = self.requests_per_minute is None or len(self._events) < self.requests_per_minute
+                # A single oversized call is let through once the window is empty
+                fits_tokens = self.tokens_per_minute is None or not self._events or self._tokens + tokens <= self.tokens_per_minute
+                if fits_requests and fits_tokens:
+                    self._events.append((now, tokens))
+                    self._tokens += tokens
+                    return
+                wait = 60.0 - (now - self._events[0][0])
+            time.sleep(max(wait, 0.05))
+
+
+# ---------------- RETRY ----------------
+def retry_call(fn: Callable[[], T], max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 30.0) -> T:
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            # Exponential backoff with jitter so concurrent workers do not retry in lockstep
+            delay = min(max_delay, base_delay * 2 ** attempt) * (0.5 + random.random() / 2)
+            time.sleep(delay)
+
+def is_retryable(exc: BaseException) -> bool:
+    # Wrappers such as LLMGenerationError/EmbeddingsGenerationError keep the OpenAI error in the chain or args
+    for e in iter_exception_chain(exc):
+        if isinstance(e, RETRYABLE_ERRORS):
+            return True
+        status = getattr(e, "status_code", None)
+        if status is not None and (status == 429 or status >= 500):
+            return True
+    return False
+
+def iter_exception_chain(exc: Optional[BaseException]):
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        arg = exc.args[0] if exc.args and isinstance(exc.args[0], BaseException) else None
+        exc = exc.__cause__ or exc.__context__ or arg
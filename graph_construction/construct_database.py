@@ -1,70 +1,305 @@
-import asyncio, json, re
+import hashlib, json, os, re, time
 from tqdm import tqdm
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
 from neo4j import Driver
+from neo4j.exceptions import Neo4jError
+from neo4j_graphrag.embeddings.openai import OpenAIEmbeddings
 from neo4j_graphrag.indexes import create_vector_index, upsert_vectors
-from neo4j_graphrag.llm import OpenAILLM
 from neo4j_graphrag.types import EntityType
-from neo4j_graphrag.experimental.components.resolver import (
-    SinglePropertyExactMatchResolver,
-    FuzzyMatchResolver,
-)
+
+from embed_entities import embed_with_store, entity_embed_text
+from embedding_store import EmbeddingStore, quantize_int8
+from resolve_entities import resolve_label
 
 
 # ---------------- ADD ENTITIES TO DB ----------------
-def build_database(driver: Driver, dst_path: str, embedder: OpenAILLM, embed_dims: int, seed_label: str, index_name: str) -> None:
+def build_database(driver: Driver, dst_path: str, embedder: OpenAIEmbeddings, embed_dims: int, vector_indexes: Dict[str, str], batch_size: int = 500, embed_batch_size: int = 256, embed_workers: int = 4, store: Optional[EmbeddingStore] = None, manifest_path: Optional[str] = None, embed_int8: bool = False) -> None:
     with open(dst_path, "r", encoding="utf-8") as file:
         data = json.load(file)
     
-    ensure_vector_index(driver, embed_dims, seed_label, index_name)
+    # Incremental mode: only upsert articles whose extracted entities/relations changed since the last build,
+    # and delete what changed or removed articles produced that no current article still does
+    if manifest_path:
+        digests = article_digests(data)
+        items = article_items(data)
+        manifest = load_manifest(manifest_path)
+        built = manifest.get("articles", {})
+        # The manifest only describes the graph it was saved with (e.g. not after clear_database or on another instance)
+        current_version = read_graph_version(driver)
+        if manifest.get("graph_version") != current_version:
+            if built:
+                print(f"⚠️ Manifest is for graph version {manifest.get('graph_version')}, database is at {current_version}; rebuilding all articles.")
+            built = {}
+        changed = {key for key, digest in digests.items() if built.get(key, {}).get("digest") != digest}
+        removed = set(built) - set(digests)
+        if not changed and not removed:
+            print("✅ Graph is up to date; no new, changed or removed articles.")
+            return
+        print(f"🔄 Incremental build: {len(changed)}/{len(digests)} articles new or changed, {len(removed)} removed")
+        delete_stale_items(driver, stale_items(built, changed | removed, items), batch_size)
+        data = select_articles(data, changed)
+    # Nodes created from here on count as recent for resolution
+    build_started = server_timestamp(driver)
+    
+    ensure_vector_indexes(driver, embed_dims, vector_indexes)
+    
+    # Upsert nodes
+    node_ids = upsert_entities(driver, data["entities"], batch_size)
+    embed_nodes(driver, embedder, node_ids, data["entities"], embed_dims, store, embed_batch_size, embed_workers, embed_int8, "🔢 Embedding entities")
+    
+    # Upsert edges; synthesized JointConcepts are embedded like any other entity
+    joints, joint_ids = upsert_relations(driver, data["relations"], batch_size)
+    embed_nodes(driver, embedder, joint_ids, joints, embed_dims, store, embed_batch_size, embed_workers, embed_int8, "🔢 Embedding joint concepts")
     
-    node_ids: List[str] = []
-    node_embeds: List[List[float]] = []
+    labels = affected_labels(data)
+    print(f"🔍 Resolving duplicate entities ({', '.join(sorted(labels))})...")
+    resolve_duplicates(driver, labels, since=build_started if manifest_path else None)
     
+    version = write_graph_version(driver)
+    if manifest_path:
+        articles = {key: {"digest": digest, **items[key]} for key, digest in digests.items()}
+        save_manifest(manifest_path, {"graph_version": version, "articles": articles})
+    print(f"✅ Graph built, {len(vector_indexes)} vector indexes populated, and deduplicated (version {version}).")
+
+
+# ---------------- INCREMENTAL BUILD ----------------
+def article_digests(data: Dict) -> Dict[str, str]:
+    # Hash of everything each source article contributed, in extraction order
+    hashes = {}
+    for kind in ("entities", "relations"):
+        for item in data[kind]:
+            sha = hashes.setdefault(item.get("article", ""), hashlib.sha256())
+            sha.update(kind.encode("utf-8"))
+            sha.update(json.dumps(item, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    return {key: sha.hexdigest() for key, sha in hashes.items()}
+
+def article_items(data: Dict) -> Dict[str, Dict[str, List[List[str]]]]:
+    # Graph items each article produces: nodes as [label, name], edges as [source label, source, type, target label, target]
+    produced: Dict[str, Tuple[Set[tuple], Set[tuple]]] = {}
+    for entity in data["entities"]:
+        nodes, _ = produced.setdefault(entity.get("article", ""), (set(), set()))
+        nodes.add((entity["type"], sanitize_label(entity["name"])))
+    for rel in data["relations"]:
+        nodes, edges = produced.setdefault(rel.get("article", ""), (set(), set()))
+        joints, groups = expand_relations([rel])
+        nodes.update(("JointConcept", joint["name"]) for joint in joints)
+        for (source_type, rel_type, target_type), rows in groups.items():
+            edges.update((source_type, row["source"], rel_type, target_type, row["target"]) for row in rows)
+    return {
+        key: {"nodes": sorted(list(n) for n in nodes), "edges": sorted(list(e) for e in edges)}
+        for key, (nodes, edges) in produced.items()
+    }
+
+def stale_items(built: Dict[str, Dict], keys: Set[str], items: Dict[str, Dict[str, List[List[str]]]]) -> Dict[str, List[tuple]]:
+    # Items the `keys` articles produced at the last build that no current article produces or connects to
+    kept_nodes = {tuple(n) for entry in items.values() for n in entry["nodes"]}
+    kept_edges = {tuple(e) for entry in items.values() for e in entry["edges"]}
+    kept_nodes |= {(e[0], e[1]) for e in kept_edges} | {(e[3], e[4]) for e in kept_edges}
+    old_nodes = {tuple(n) for key in keys for n in built.get(key, {}).get("nodes", [])}
+    old_edges = {tuple(e) for key in keys for e in built.get(key, {}).get("edges", [])}
+    return {"nodes": sorted(old_nodes - kept_nodes), "edges": sorted(old_edges - kept_edges)}
+
+def select_articles(data: Dict, keys: Set[str]) -> Dict:
+    return {
+        kind: [item for item in data[kind] if item.get("article", "") in keys]
+        for kind in ("entities", "relations")
+    }
+
+def affected_labels(data: Dict) -> Set[str]:
+    labels = {entity["type"] for entity in data["entities"]}
+    if any(len(rel.get("source_concepts") or []) > 1 for rel in data["relations"]):
+        labels.add("JointConcept")
+    return labels
+
+def load_manifest(manifest_path: str) -> Dict:
+    # {"graph_version": ..., "articles": {key: {"digest", "nodes", "edges"}}}; older per-article digest maps rebuild fully
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r", encoding="utf-8") as file:
+        manifest = json.load(file)
+    return manifest if "articles" in manifest else {}
+
+def save_manifest(manifest_path: str, manifest: Dict) -> None:
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, manifest_path)
+
+
+# ---------------- NEO4J OPERATIONS ----------------
+ENTITY_LABELS = ["Form", "Concept", "Myth", "JointConcept"]
+REL_TYPES = ["CONNOTES", "PART_OF", "GENERATES_MYTH"]
+
+def ensure_vector_indexes(driver: Driver, embed_dims: int, vector_indexes: Dict[str, str]) -> None:
+    # Name lookups back every MERGE/MATCH during loading, so bootstrap them first
+    ensure_name_indexes(driver)
+    # One vector index per label over the shared `embedding` property
+    for label, index_name in vector_indexes.items():
+        if label not in ENTITY_LABELS:
+            raise ValueError(f"Unsupported entity type: {label}")
+        create_vector_index(
+            driver=driver,
+            name=index_name,
+            label=label,
+            embedding_property="embedding",
+            dimensions=embed_dims,
+            similarity_fn="cosine",
+        )
+
+def ensure_name_indexes(driver: Driver) -> None:
     with driver.session() as session:
-        # Upsert nodes
-        for entity in tqdm(data["entities"], total=len(data["entities"]), desc="⬆️  Upserting entities"):
-            node_id = session.execute_write(create_node, entity)
-            node_ids.append(node_id)
-
-            embed_text = f"Name: {entity['name']} | Description: {entity['description']}"
-            if entity.get("aliases"):
-                embed_text += f" | Aliases: {', '.join(entity['aliases'])}"
-            node_embeds.append(embedder.embed_query(embed_text))
-        
-        # Batch upsert node embeddings
-        if node_ids:
+        indexed = {
+            rec["label"]
+            for rec in session.run(
+                "SHOW INDEXES YIELD type, entityType, labelsOrTypes, properties "
+                "WHERE type = 'RANGE' AND entityType = 'NODE' AND properties = ['name'] "
+                "RETURN labelsOrTypes[0] AS label"
+            )
+        }
+        for label in ENTITY_LABELS:
+            if label in indexed:
+                continue
+            try:
+                # A uniqueness constraint is backed by a range index on name
+                session.run(f"CREATE CONSTRAINT {label.lower()}_name_unique IF NOT EXISTS FOR (n:`{label}`) REQUIRE n.name IS UNIQUE").consume()
+            except Neo4jError as e:
+                # Existing duplicate names block the constraint; fall back to a plain index
+                print(f"⚠️ Warning: could not create uniqueness constraint on {label}.name ({e.code}); creating an index instead.")
+                session.run(f"CREATE INDEX {label.lower()}_name IF NOT EXISTS FOR (n:`{label}`) ON (n.name)").consume()
+        session.run("CALL db.awaitIndexes(300)").consume()
+
+        for label in ENTITY_LABELS:
+            plan = session.run("EXPLAIN " + merge_nodes_query(label), rows=[]).consume().plan
+            if not plan_uses_index(plan):
+                print(f"⚠️ Warning: MERGE on {label}.name does not use an index seek; ingestion will scan all {label} nodes.")
+
+def upsert_entities(driver: Driver, entities: List[Dict], batch_size: int = 500) -> List[str]:
+    # Same MERGE/coalesce semantics as create_node, one UNWIND batch per transaction
+    groups: Dict[str, List[Dict]] = {}
+    for idx, entity in enumerate(entities):
+        entity_type = entity["type"]
+        if entity_type not in ENTITY_LABELS:
+            raise ValueError(f"Unsupported entity type: {entity_type}")
+        groups.setdefault(entity_type, []).append({
+            "idx": idx,
+            "name": sanitize_label(entity["name"]),
+            "description": entity["description"],
+        })
+
+    node_ids: List[Optional[str]] = [None] * len(entities)
+    start = time.perf_counter()
+    with driver.session() as session, tqdm(total=len(entities), desc="⬆️  Upserting entities") as pbar:
+        for label, rows in groups.items():
+            for batch in batched(rows, batch_size):
+                for rec in session.execute_write(merge_nodes, label, batch):
+                    node_ids[rec["idx"]] = rec["eid"]
+                pbar.update(len(batch))
+    report_rate("entities", len(entities), time.perf_counter() - start)
+    return node_ids
+
+def embed_nodes(driver: Driver, embedder: OpenAIEmbeddings, node_ids: List[Optional[str]], entities: List[Dict], embed_dims: int, store: Optional[EmbeddingStore], batch_size: int, max_workers: int, embed_int8: bool, desc: str) -> None:
+    # Embed in concurrent batches and upsert each chunk of vectors as it arrives
+    embed_texts = [entity_embed_text(entity) for entity in entities]
+    with tqdm(total=len(embed_texts), desc=desc) as pbar:
+        for indices, node_embeds in embed_with_store(embedder, embed_texts, store, batch_size, max_workers, dimensions=embed_dims):
+            ids = [node_ids[i] for i in indices]
+            # setNodeVectorProperty stores the indexed vector as a float32 array
             upsert_vectors(
                 driver=driver,
-                ids=node_ids,
+                ids=ids,
                 embedding_property="embedding",
                 embeddings=node_embeds,
                 entity_type=EntityType.NODE,
             )
-        
-        # Upsert edges
-        for rel in tqdm(data["relations"], total=len(data["relations"]), desc="⬆️  Upserting relationships"):
-            joint_node_id = session.execute_write(create_edges, rel)
-            if joint_node_id:
-                node_ids.extend(joint_node_id)
-    
-    print("🔍 Resolving duplicate entities...")
-    asyncio.run(resolve_duplicates(driver))
-    
-    print("✅ Graph built, single vector index populated, and deduplicated.")
+            if embed_int8:
+                # Compact copy for client-side reranking: 1 byte per dimension on the wire
+                driver.execute_query(
+                    "UNWIND $rows AS row MATCH (n) WHERE elementId(n) = row.id SET n.embedding_int8 = row.vector",
+                    rows=[{"id": nid, "vector": quantize_int8(vector)} for nid, vector in zip(ids, node_embeds)],
+                )
+            pbar.update(len(node_embeds))
 
+def upsert_relations(driver: Driver, relations: List[Dict], batch_size: int = 500) -> Tuple[List[Dict], List[Optional[str]]]:
+    # Same edges as create_edges, including synthesized JointConcept nodes
+    joints, groups = expand_relations(relations)
+    total = len(joints) + sum(len(rows) for rows in groups.values())
 
-# ---------------- NEO4J OPERATIONS ----------------
-def ensure_vector_index(driver: Driver, embed_dims: int, seed_label: str, index_name: str) -> None:
-    create_vector_index(
-        driver=driver,
-        name=index_name,
-        label=seed_label,
-        embedding_property="embedding",
-        dimensions=embed_dims,
-        similarity_fn="cosine",
-    )
+    joint_ids: List[Optional[str]] = [None] * len(joints)
+    start = time.perf_counter()
+    with driver.session() as session, tqdm(total=total, desc="⬆️  Upserting relationships") as pbar:
+        for batch in batched(joints, batch_size):
+            for rec in session.execute_write(merge_nodes, "JointConcept", batch):
+                joint_ids[rec["idx"]] = rec["eid"]
+            pbar.update(len(batch))
+        for (source_type, rel_type, target_type), rows in groups.items():
+            for batch in batched(rows, batch_size):
+                matched = set(session.execute_write(merge_edges, source_type, rel_type, target_type, batch))
+                for row in batch:
+                    if row["idx"] not in matched:
+                        print(f"⚠️ Warning: could not create edge {row['source']}-[{rel_type}]->{row['target']}")
+                pbar.update(len(batch))
+    report_rate("relationship rows", total, time.perf_counter() - start)
+    return joints, joint_ids
+
+def expand_relations(relations: List[Dict]) -> Tuple[List[Dict], Dict[Tuple[str, str, str], List[Dict]]]:
+    joints: List[Dict] = []
+    groups: Dict[Tuple[str, str, str], List[Dict]] = {}
+
+    def add_edge(source: str, source_type: str, target: str, target_type: str, rel_type: str, description: Optional[str]) -> None:
+        rows = groups.setdefault((source_type, rel_type, target_type), [])
+        rows.append({
+            "idx": len(rows),
+            "source": source,
+            "target": target,
+            "description": description,
+        })
+
+    for rel in relations:
+        rel_type = rel["type"].upper().replace(" ", "_")
+        description = rel.get("description")
+        if rel_type == "CONNOTES":
+            add_edge(sanitize_label(rel["source"]), "Form", sanitize_label(rel["target"]), "Concept", rel_type, description)
+        elif rel_type == "GENERATES_MYTH":
+            if len(rel["source_concepts"]) == 1:
+                add_edge(sanitize_label(rel["source_concepts"][0]), "Concept", sanitize_label(rel["target"]), "Myth", rel_type, description)
+            else:
+                joint_name = sanitize_label("+".join(sorted(rel["source_concepts"])))
+                joints.append({
+                    "idx": len(joints),
+                    "name": joint_name,
+                    "description": f"Joint form of concepts: {', '.join(rel['source_concepts'])}",
+                })
+                for source in rel["source_concepts"]:
+                    add_edge(sanitize_label(source), "Concept", joint_name, "JointConcept", "PART_OF", description)
+                add_edge(joint_name, "JointConcept", sanitize_label(rel["target"]), "Myth", rel_type, description)
+        else:
+            raise ValueError(f"Unsupported relationship type: {rel_type}")
+    return joints, groups
+
+def merge_nodes(tx, label: str, rows: List[Dict]) -> List[Dict]:
+    return tx.run(merge_nodes_query(label), rows=rows).data()
+
+def merge_nodes_query(label: str) -> str:
+    return f"""
+    UNWIND $rows AS row
+    MERGE (n:{label} {{name: row.name}})
+    ON CREATE SET n.description = row.description, n.created_at = timestamp()
+    ON MATCH  SET n.description = coalesce(n.description, row.description)
+    RETURN row.idx AS idx, elementId(n) AS eid
+    """
+
+def merge_edges(tx, source_type: str, rel_type: str, target_type: str, rows: List[Dict]) -> List[int]:
+    query = f"""
+    UNWIND $rows AS row
+    MATCH (a:{source_type} {{name: row.source}})
+    MATCH (b:{target_type} {{name: row.target}})
+    MERGE (a)-[r:{rel_type}]->(b)
+    ON CREATE SET r.description = row.description
+    ON MATCH  SET r.description = coalesce(r.description, row.description)
+    RETURN collect(DISTINCT row.idx) AS matched
+    """
+    return tx.run(query, rows=rows).single()["matched"]
 
 def create_node(tx, entity: Dict) -> Optional[str]:
     entity_type = entity["type"]
@@ -73,7 +308,7 @@ def create_node(tx, entity: Dict) -> Optional[str]:
     
     query = f"""
     MERGE (n:{entity_type} {{name: $name}})
-    ON CREATE SET n.description = $description
+    ON CREATE SET n.description = $description, n.created_at = timestamp()
     ON MATCH  SET n.description = coalesce(n.description, $description)
     RETURN elementId(n) AS eid
     """
@@ -156,22 +391,44 @@ def create_edges(tx, rel: Dict) -> Optional[str]:
     
     return node_id
 
-async def resolve_duplicates(driver: Driver) -> None:
+def delete_stale_items(driver: Driver, stale: Dict[str, List[tuple]], batch_size: int = 500) -> None:
+    if not stale["nodes"] and not stale["edges"]:
+        return
+    edge_groups: Dict[Tuple[str, str, str], List[Dict]] = {}
+    for source_type, source, rel_type, target_type, target in stale["edges"]:
+        edge_groups.setdefault((source_type, rel_type, target_type), []).append({"source": source, "target": target})
+    node_groups: Dict[str, List[Dict]] = {}
+    for label, name in stale["nodes"]:
+        node_groups.setdefault(label, []).append({"name": name})
+
+    with driver.session() as session:
+        for (source_type, rel_type, target_type), rows in edge_groups.items():
+            if source_type not in ENTITY_LABELS or target_type not in ENTITY_LABELS or rel_type not in REL_TYPES:
+                raise ValueError(f"Unsupported relationship: {source_type}-[{rel_type}]->{target_type}")
+            for batch in batched(rows, batch_size):
+                session.run(
+                    "UNWIND $rows AS row "
+                    f"MATCH (:{source_type} {{name: row.source}})-[r:{rel_type}]->(:{target_type} {{name: row.target}}) "
+                    "DELETE r",
+                    rows=batch,
+                ).consume()
+        for label, rows in node_groups.items():
+            if label not in ENTITY_LABELS:
+                raise ValueError(f"Unsupported entity type: {label}")
+            for batch in batched(rows, batch_size):
+                session.run(f"UNWIND $rows AS row MATCH (n:{label} {{name: row.name}}) DETACH DELETE n", rows=batch).consume()
+    print(f"🗑️  Deleted {len(stale['nodes'])} nodes and {len(stale['edges'])} relationships no longer produced by any article")
+
+def resolve_duplicates(driver: Driver, labels: Optional[Set[str]] = None, since: Optional[int] = None) -> None:
     if not apoc_available(driver):
         print("⚠️ APOC not available; skipping entity resolution.")
         return
-    # Exact match first
-    exact = SinglePropertyExactMatchResolver(driver=driver)
-    await exact.run()
-    # Fuzzy match by label and name
-    for label in ["Form", "Concept", "Myth", "JointConcept"]:
-        fuzzy = FuzzyMatchResolver(
-            driver=driver,
-            filter_query=f"WHERE entity:`{label}`",
-            resolve_properties=["name"],
-            similarity_threshold=0.95,
-        )
-        await fuzzy.run()
+    # Blocked fuzzy match by label and name (exact duplicates score 1.0)
+    for label in ENTITY_LABELS:
+        if labels is not None and label not in labels:
+            continue
+        stats = resolve_label(driver, label, threshold=0.95, since=since)
+        print(f"   {label}: {stats['nodes']} nodes, {stats['pairs_considered']} pairs considered, {stats['merges']} merges applied")
 
 def clear_database(driver: Driver) -> None:
     with driver.session() as session:
@@ -189,6 +446,15 @@ def clear_database(driver: Driver) -> None:
 
 
 # ---------------- UTILS ----------------
+def batched(items: List, size: int) -> Iterator[List]:
+    size = max(1, size)
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+def report_rate(what: str, count: int, elapsed: float) -> None:
+    rate = count / elapsed if elapsed > 0 else float("inf")
+    print(f"⏱️  Upserted {count} {what} in {elapsed:.1f}s ({rate:.0f} rows/s)")
+
 def sanitize_label(raw: str) -> str:
     tokens = re.split(r'[^A-Za-z0-9]+', raw)
     tokens = [t for t in tokens if t]
@@ -197,6 +463,31 @@ def sanitize_label(raw: str) -> str:
         label = "Entity" + label  # ensure starts with a letter
     return label
 
+def plan_uses_index(plan: Optional[Dict]) -> bool:
+    # Walk the EXPLAIN plan tree for a (unique) node index seek
+    if not plan:
+        return False
+    if "IndexSeek" in plan.get("operatorType", ""):
+        return True
+    return any(plan_uses_index(child) for child in plan.get("children", []))
+
+def write_graph_version(driver: Driver) -> str:
+    # Readers (e.g. response_generation's retrieval cache) drop results computed against older versions
+    records, _, _ = driver.execute_query(
+        "MERGE (m:GraphMeta {id: 'graph'}) "
+        "SET m.version = randomUUID(), m.built_at = timestamp() "
+        "RETURN m.version AS version"
+    )
+    return records[0]["version"]
+
+def read_graph_version(driver: Driver) -> Optional[str]:
+    records, _, _ = driver.execute_query("MATCH (m:GraphMeta {id: 'graph'}) RETURN m.version AS version")
+    return records[0]["version"] if records else None
+
+def server_timestamp(driver: Driver) -> int:
+    records, _, _ = driver.execute_query("RETURN timestamp() AS ts")
+    return records[0]["ts"]
+
 def apoc_available(driver: Driver) -> bool:
     with driver.session() as session:
         try:
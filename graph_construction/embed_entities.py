@@ -0,0 +1,69 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from neo4j_graphrag.embeddings.openai import OpenAIEmbeddings
+
+from concurrency import retry_call
+from embedding_store import EmbeddingStore
+
+
+# ---------------- EMBED ENTITIES ----------------
+def embed_batches(embedder: OpenAIEmbeddings, texts: List[str], batch_size: int = 256, max_workers: int = 4, max_retries: int = 5, **kwargs: Any) -> Iterator[Tuple[int, List[List[float]]]]:
+    """
+    Yield `(offset, vectors)` for consecutive batches of `texts`, in input order.
+    Batches go through the embeddings endpoint's multi-input form on a bounded thread pool.
+    """
+    def run(batch: List[str]) -> List[List[float]]:
+        response = retry_call(
+            lambda: embedder.client.embeddings.create(input=batch, model=embedder.model, **kwargs),
+            max_retries=max_retries,
+        )
+        return [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # Keep at most two batches per worker in flight so memory stays flat
+        pending = deque()
+        for offset in range(0, len(texts), batch_size):
+            pending.append((offset, pool.submit(run, texts[offset : offset + batch_size])))
+            if len(pending) >= 2 * max_workers:
+                offset_done, future = pending.popleft()
+                yield offset_done, future.result()
+        while pending:
+            offset_done, future = pending.popleft()
+            yield offset_done, future.result()
+
+def embed_with_store(embedder: OpenAIEmbeddings, texts: List[str], store: Optional[EmbeddingStore] = None, batch_size: int = 256, max_workers: int = 4, **kwargs: Any) -> Iterator[Tuple[List[int], List[List[float]]]]:
+    """
+    Yield `(indices, vectors)` chunks covering every text: cached vectors first, looked up a batch at a time,
+    then freshly embedded batches, which are written back to the store as they arrive.
+    A `dimensions` kwarg is forwarded to the API and also served from larger cached vectors.
+    """
+    if store is None:
+        for offset, vectors in embed_batches(embedder, texts, batch_size, max_workers, **kwargs):
+            yield list(range(offset, offset + len(vectors))), vectors
+        return
+
+    # Look up one batch at a time so cached vectors are never all held as Python lists at once
+    hits, miss_idx = 0, []
+    for offset in range(0, len(texts), batch_size):
+        cached = store.get_many(embedder.model, texts[offset : offset + batch_size], kwargs.get("dimensions"))
+        indices = [offset + i for i, vector in enumerate(cached) if vector is not None]
+        miss_idx.extend(offset + i for i, vector in enumerate(cached) if vector is None)
+        if indices:
+            hits += len(indices)
+            yield indices, [vector for vector in cached if vector is not None]
+    print(f"🗂️  Embedding store: {hits} cached, {len(miss_idx)} to embed")
+
+    miss_texts = [texts[i] for i in miss_idx]
+    for offset, vectors in embed_batches(embedder, miss_texts, batch_size, max_workers, **kwargs):
+        store.put_many(embedder.model, miss_texts[offset : offset + len(vectors)], vectors)
+        yield miss_idx[offset : offset + len(vectors)], vectors
+
+
+# ---------------- UTILS ----------------
+def entity_embed_text(entity: Dict) -> str:
+    embed_text = f"Name: {entity['name']} | Description: {entity['description']}"
+    if entity.get("aliases"):
+        embed_text += f" | Aliases: {', '.join(entity['aliases'])}"
+    return embed_text
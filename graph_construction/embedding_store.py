@@ -0,0 +1,117 @@
+import hashlib, os, sqlite3, threading, time
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+
+# ---------------- EMBEDDING STORE ----------------
+class EmbeddingStore:
+    """
+    On-disk embedding cache keyed by (model, sha256 of the embed text).
+    Vectors are stored as float32 blobs in SQLite, so reruns only embed new or changed text.
+    Lookups for fewer `dims` than stored are served by truncating and re-normalizing the stored vector.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model     TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    dims      INTEGER NOT NULL,
+                    vector    BLOB NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                )
+            """)
+
+    def get_many(self, model: str, texts: Sequence[str], dims: Optional[int] = None) -> List[Optional[List[float]]]:
+        hashes = [text_hash(text) for text in texts]
+        found: Dict[str, List[float]] = {}
+        with self._lock, self._conn:
+            for chunk in chunked(sorted(set(hashes)), 500):
+                rows = self._conn.execute(
+                    f"SELECT text_hash, dims, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(chunk))})",
+                    [model, *chunk],
+                ).fetchall()
+                for h, stored_dims, blob in rows:
+                    if dims is None or stored_dims == dims:
+                        found[h] = np.frombuffer(blob, dtype=np.float32).tolist()
+                    elif stored_dims > dims:
+                        found[h] = reduce_dims(np.frombuffer(blob, dtype=np.float32), dims).tolist()
+            # Mark hits as used so prune() keeps them
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                [(time.time(), model, h) for h in found],
+            )
+        return [found.get(h) for h in hashes]
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        now = time.time()
+        rows = [
+            (model, text_hash(text), len(vector), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, dims, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT model, dims, count(*), sum(length(vector)) FROM embeddings GROUP BY model, dims"
+            ).fetchall()
+        return {
+            f"{model} ({dims}d)": {"entries": count, "bytes": size}
+            for model, dims, count, size in rows
+        }
+
+    def prune(self, max_age_days: Optional[float] = None, model: Optional[str] = None) -> int:
+        # Drop entries not used within max_age_days and/or belonging to other models
+        clauses, params = [], []
+        if max_age_days is not None:
+            clauses.append("last_used < ?")
+            params.append(time.time() - max_age_days * 86400)
+        if model is not None:
+            clauses.append("model != ?")
+            params.append(model)
+        if not clauses:
+            return 0
+        with self._lock, self._conn:
+            cur = self._conn.execute(f"DELETE FROM embeddings WHERE {' OR '.join(clauses)}", params)
+            removed = cur.rowcount
+        if removed:
+            with self._lock:
+                self._conn.execute("VACUUM")
+        return removed
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+# ---------------- UTILS ----------------
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def reduce_dims(vectors: np.ndarray, dims: int) -> np.ndarray:
+    # Same as requesting `dimensions=dims` from text-embedding-3 models: keep the prefix, re-normalize
+    reduced = np.asarray(vectors, dtype=np.float32)[..., :dims]
+    norms = np.linalg.norm(reduced, axis=-1, keepdims=True)
+    return reduced / np.where(norms == 0, 1.0, norms)
+
+def quantize_int8(vector: Sequence[float]) -> bytes:
+    # Symmetric per-vector scale; cosine similarity is scale-invariant, so no scale is stored
+    v = np.asarray(vector, dtype=np.float32)
+    peak = float(np.abs(v).max()) if v.size else 0.0
+    if peak == 0:
+        return np.zeros(v.shape, dtype=np.int8).tobytes()
+    return np.round(v / peak * 127).astype(np.int8).tobytes()
+
+def chunked(items: List, size: int):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
@@ -0,0 +1,94 @@
+import json, os, time
+import numpy as np
+from tqdm import tqdm
+from typing import Dict, List
+
+from neo4j import Driver
+
+from construct_database import ENTITY_LABELS, REL_TYPES, report_rate
+from precompute_paths import embedding_matrix, load_meta
+
+
+# ---------------- EXPORT SNAPSHOT ----------------
+def export_snapshot(driver: Driver, dst_dir: str, labels: List[str] = ENTITY_LABELS, rel_types: List[str] = REL_TYPES, batch_size: int = 1000) -> None:
+    """
+    Snapshot the entity graph into array-backed files for response_generation's in-process retriever:
+    `embeddings.npy` (float32, N x dims), `node_labels.npy` (int8 codes into `labels`),
+    `indptr.npy` / `indices.npy` / `edge_types.npy` (outgoing edges in CSR order),
+    `nodes.json` / `edges.json` (ids and text, row-aligned) and `meta.json` (graph version, vocabularies).
+    """
+    os.makedirs(dst_dir, exist_ok=True)
+    start = time.perf_counter()
+
+    version_records, _, _ = driver.execute_query("MATCH (m:GraphMeta {id: 'graph'}) RETURN m.version AS version")
+    meta = {
+        "version": version_records[0]["version"] if version_records else None,
+        "labels": labels,
+        "rel_types": rel_types,
+    }
+    current = load_meta(dst_dir)
+    if meta["version"] is not None and current and all(current.get(k) == v for k, v in meta.items()):
+        print(f"✅ Graph snapshot is up to date (version {meta['version']}).")
+        return
+
+    # Nodes, row-aligned across nodes.json, node_labels.npy and embeddings.npy
+    nodes: List[Dict] = []
+    node_labels: List[int] = []
+    embeddings = []
+    with driver.session(fetch_size=batch_size) as session:
+        total = session.run(
+            "MATCH (n) WHERE any(l IN labels(n) WHERE l IN $labels) RETURN count(n) AS n", labels=labels
+        ).single()["n"]
+        result = session.run(
+            """
+            MATCH (n) WHERE any(l IN labels(n) WHERE l IN $labels)
+            RETURN elementId(n) AS id,
+                   [l IN labels(n) WHERE l IN $labels][0] AS label,
+                   coalesce(n.name, "(unnamed)") AS name,
+                   coalesce(n.description, "") AS description,
+                   n.embedding AS embedding
+            """,
+            labels=labels,
+        )
+        for rec in tqdm(result, total=total, desc="📦 Exporting nodes"):
+            nodes.append({"id": rec["id"], "name": rec["name"], "description": rec["description"]})
+            node_labels.append(labels.index(rec["label"]))
+            embeddings.append(rec["embedding"])
+    row_of = {n["id"]: i for i, n in enumerate(nodes)}
+
+    # Edges, sorted by source row so edge i is CSR position i
+    with driver.session(fetch_size=batch_size) as session:
+        result = session.run(
+            """
+            MATCH (a)-[r]->(b)
+            WHERE type(r) IN $rel_types
+              AND any(l IN labels(a) WHERE l IN $labels) AND any(l IN labels(b) WHERE l IN $labels)
+            RETURN elementId(r) AS id, type(r) AS type, elementId(a) AS src, elementId(b) AS dst,
+                   coalesce(r.description, "") AS description
+            """,
+            rel_types=rel_types,
+            labels=labels,
+        )
+        edges = [rec.data() for rec in tqdm(result, desc="📦 Exporting edges")]
+    edges.sort(key=lambda e: row_of[e["src"]])
+
+    src = np.fromiter((row_of[e["src"]] for e in edges), dtype=np.int64, count=len(edges))
+    indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=len(nodes)), out=indptr[1:])
+    indices = np.fromiter((row_of[e["dst"]] for e in edges), dtype=np.int32, count=len(edges))
+    edge_types = np.fromiter((rel_types.index(e["type"]) for e in edges), dtype=np.int8, count=len(edges))
+
+    np.save(os.path.join(dst_dir, "embeddings.npy"), embedding_matrix(embeddings))
+    np.save(os.path.join(dst_dir, "node_labels.npy"), np.asarray(node_labels, dtype=np.int8))
+    np.save(os.path.join(dst_dir, "indptr.npy"), indptr)
+    np.save(os.path.join(dst_dir, "indices.npy"), indices)
+    np.save(os.path.join(dst_dir, "edge_types.npy"), edge_types)
+    with open(os.path.join(dst_dir, "nodes.json"), "w", encoding="utf-8") as file:
+        json.dump(nodes, file, ensure_ascii=False)
+    with open(os.path.join(dst_dir, "edges.json"), "w", encoding="utf-8") as file:
+        json.dump([{"id": e["id"], "description": e["description"]} for e in edges], file, ensure_ascii=False)
+    with open(os.path.join(dst_dir, "meta.json"), "w", encoding="utf-8") as file:
+        json.dump({**meta, "nodes": len(nodes), "edges": len(edges)}, file, ensure_ascii=False, indent=2)
+
+    report_rate("nodes", len(nodes), time.perf_counter() - start)
+    print(f"✅ Snapshot of {len(nodes)} nodes and {len(edges)} edges written to {dst_dir} (version {meta['version']}).")
@@ -1,60 +1,156 @@
-import json, re
+import hashlib, json, os, re, shutil, tempfile, textwrap
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
+from typing import IO, Dict, List, Optional, Tuple
 
 from neo4j_graphrag.llm import OpenAILLM
 from neo4j_graphrag.generation.prompts import PromptTemplate
 
+from chunking import Chunker, estimate_tokens, fixed_chunks
+from concurrency import RateLimiter, retry_call
 from prompts import SYSTEM_PROMPT, USER_PROMPT
 
 
 # ---------------- EXTRACT ENTITIES ----------------
-def extract_data(llm: OpenAILLM, src_path: str, dst_path: str, checkpoint: int, chunk_size: int = 512) -> None:
+def extract_data(llm: OpenAILLM, src_path: str, dst_path: str, checkpoint: int, chunk_size: int = 512, chunker: Optional[Chunker] = None, max_workers: int = 4, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None, journal_path: Optional[str] = None) -> None:
     prompt = PromptTemplate(
         template=USER_PROMPT,
         expected_inputs=["passage"],
     )
+    limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    journal_path = journal_path or os.path.splitext(dst_path)[0] + ".journal.jsonl"
+    chunker = chunker or (lambda text: fixed_chunks(text, chunk_size))
+
+    def run(chunk: str) -> Dict:
+        passage = prompt.format(passage=chunk)
+        # Budget prompt plus expected completion: max_tokens if set, else about the passage's size in JSON
+        completion_tokens = (llm.model_params or {}).get("max_tokens") or estimate_tokens(chunk)
+        tokens = estimate_tokens(SYSTEM_PROMPT + passage) + completion_tokens
+
+        def call():
+            # Acquire per attempt so 429/5xx retries are counted against the budget too
+            limiter.acquire(tokens)
+            return llm.invoke(
+                input=passage,
+                system_instruction=SYSTEM_PROMPT,
+            )
+
+        result = retry_call(call)
+        # cleaned_string = clean_llm_output(result.content)
+        # content = json.loads(cleaned_string)
+        return json.loads(result.content)
+
     with open(src_path, "r") as src_file:
         entries = json.load(src_file)
-    with open(dst_path, "w+", encoding="utf-8") as dst_file:
+
+    # Jobs are keyed by (article key, chunk index, chunk hash)
+    jobs = []
+    for i, entry in enumerate(entries):
+        chunks = chunker(entry["body"])
+        key = article_key(entry, i)
+        jobs.extend(
+            (key, k, chunk_hash(chunk), chunk)
+            for k, chunk in enumerate(chunks)
+            if len(chunk.strip()) > 0
+        )
+
+    # Resume: skip chunks whose result is already journaled for the same text
+    done = index_journal(journal_path)
+    todo = [job for job in jobs if done.get(job[:2], (None,))[0] != job[2]]
+    if len(todo) < len(jobs):
+        print(f"⏩ Resuming extraction: {len(jobs) - len(todo)}/{len(jobs)} chunks already journaled")
+
+    with open(journal_path, "a+b") as journal, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # Terminate a record cut off by a crash so the next one starts on a fresh line
+        journal.seek(0, os.SEEK_END)
+        if journal.tell() > 0:
+            journal.seek(-1, os.SEEK_END)
+            if journal.read(1) != b"\n":
+                journal.write(b"\n")
+
+        futures = {pool.submit(run, chunk): (i, k, h) for i, k, h, chunk in todo}
         try:
-            data = json.load(dst_file)
-        except json.JSONDecodeError:
-            data = {
-                "entities": [],
-                "relations": [],
-            }
-        for i, entry in enumerate(entries):
-            # TODO: Apply semantic chunking or sliding window
-            text = entry["body"]
-            chunks = [
-                text[i : i + chunk_size]
-                for i in range(0, len(text), chunk_size)
-            ]
-            for chunk in tqdm(chunks, desc=f"🔄 Processing entry {i+1}/{len(entries)}", leave=False):
-                if len(chunk.strip()) == 0:
-                    continue
-                result = llm.invoke(
-                    input=prompt.format(passage=chunk),
-                    system_instruction=SYSTEM_PROMPT,
-                )
-                # cleaned_string = clean_llm_output(result.content)
-                # content = json.loads(cleaned_string)
-                content = json.loads(result.content)
-                data['entities'].extend(content['entities'])
-                data['relations'].extend(content['relations'])
-                # break # Only process first chunk for now
-            
-            if i % checkpoint == 0:
-                dst_file.seek(0)
-                json.dump(data, dst_file, ensure_ascii=False, indent=4)
-                dst_file.truncate()
-        
-        dst_file.seek(0)
-        json.dump(data, dst_file, ensure_ascii=False, indent=4)
-        dst_file.truncate()
+            for n, future in enumerate(tqdm(as_completed(futures), total=len(futures), desc="🔄 Extracting entities")):
+                i, k, h = futures[future]
+                content = future.result()
+                record = {
+                    "entry": i,
+                    "chunk": k,
+                    "hash": h,
+                    "entities": content["entities"],
+                    "relations": content["relations"],
+                }
+                journal.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+                if (n + 1) % checkpoint == 0:
+                    journal.flush()
+                    os.fsync(journal.fileno())
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    compact_journal(journal_path, dst_path, [job[:3] for job in jobs])
+
+
+# ---------------- JOURNAL ----------------
+def index_journal(journal_path: str) -> Dict[Tuple[str, int], Tuple[str, int]]:
+    # (article key, chunk) -> (hash, byte offset) of its latest journaled result
+    index = {}
+    if not os.path.exists(journal_path):
+        return index
+    with open(journal_path, "rb") as journal:
+        offset = 0
+        for line in journal:
+            try:
+                record = json.loads(line)
+                index[(record["entry"], record["chunk"])] = (record["hash"], offset)
+            except (json.JSONDecodeError, KeyError, UnicodeDecodeError):
+                pass
+            offset += len(line)
+    return index
+
+def compact_journal(journal_path: str, dst_path: str, keys: List[Tuple[str, int, str]]) -> None:
+    # Stream journaled results for the current chunks, in chunk order, into the final JSON;
+    # relations are spooled to a temp file so both arrays are written in a single pass.
+    # Every item is tagged with its source article so builds can be incremental.
+    index = index_journal(journal_path)
+    tmp_path = f"{dst_path}.tmp"
+    counts = {"entities": 0, "relations": 0}
+
+    def write_items(out: IO[str], kind: str, items: List[Dict], article: str) -> None:
+        for item in items:
+            out.write(",\n" if counts[kind] else "\n")
+            out.write(textwrap.indent(json.dumps({**item, "article": article}, ensure_ascii=False, indent=4), " " * 8))
+            counts[kind] += 1
+
+    with open(journal_path, "rb") as journal, open(tmp_path, "w", encoding="utf-8") as dst_file, tempfile.TemporaryFile("w+", encoding="utf-8") as rel_spool:
+        dst_file.write('{\n    "entities": [')
+        for i, k, h in keys:
+            found = index.get((i, k))
+            if found is None or found[0] != h:
+                continue
+            journal.seek(found[1])
+            record = json.loads(journal.readline())
+            write_items(dst_file, "entities", record["entities"], i)
+            write_items(rel_spool, "relations", record["relations"], i)
+        dst_file.write('\n    ],\n    "relations": [')
+        rel_spool.seek(0)
+        shutil.copyfileobj(rel_spool, dst_file)
+        dst_file.write('\n    ]\n}\n')
+    os.replace(tmp_path, dst_path)
+    print(f"🗜️  Compacted {counts['entities']} entities and {counts['relations']} relations into {dst_path}")
 
 
 # ---------------- UTILS ----------------
 def clean_llm_output(output: str) -> str:
     cleaned = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f]', '', output, flags=re.UNICODE)
-    return cleaned
\ No newline at end of file
+    return cleaned
+
+def article_key(entry: Dict, index: int) -> str:
+    # Stable across runs for articles exported from the article store; positional otherwise
+    if entry.get("source") and entry.get("eid"):
+        return f"{entry['source']}:{entry['eid']}"
+    return str(index)
+
+def chunk_hash(chunk: str) -> str:
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()[:16]
\ No newline at end of file
@@ -5,8 +5,12 @@ from neo4j import Driver, GraphDatabase
 from neo4j_graphrag.embeddings.openai import OpenAIEmbeddings
 from neo4j_graphrag.llm import OpenAILLM
 
+from chunking import get_chunker
 from extract_entities import extract_data
 from construct_database import clear_database, build_database
+from export_snapshot import export_snapshot
+from precompute_paths import precompute_paths
+from embedding_store import EmbeddingStore
 
 
 # ---------------- CONFIG ----------------
@@ -18,13 +22,42 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 URI = os.getenv("NEO4J_URI")
 AUTH = (os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD"))
 
-INDEX_NAME = "Index"
-SEED_LABEL = "Form"
+VECTOR_INDEXES = {   # label -> vector index over its `embedding` property
+    "Form": "Index",
+    "Concept": "ConceptIndex",
+    "Myth": "MythIndex",
+    "JointConcept": "JointConceptIndex",
+}
 
 EMBED_MODEL = "text-embedding-3-large"
-EMBED_DIMS = 3072
+EMBED_DIMS = 3072      # text-embedding-3 models can return fewer (e.g. 1024); vector indexes must be recreated on change
+EMBED_INT8 = False     # also store an int8 `embedding_int8` copy for the "numpy" retriever
 GENERATION_MODEL = "gpt-4o"
 
+BATCH_SIZE = 500         # rows per UNWIND transaction during bulk loading
+EMBED_BATCH_SIZE = 256   # inputs per embeddings request
+EMBED_WORKERS = 4        # concurrent embeddings requests
+
+CHUNKER = "sentence"         # "sentence" packs whole sentences, "fixed" slices characters
+CHUNK_MAX_TOKENS = 1500      # per extraction call
+CHUNK_OVERLAP_TOKENS = 100   # sentences carried over between chunks
+
+EXTRACT_WORKERS = 4                # concurrent extraction requests
+EXTRACT_REQUESTS_PER_MINUTE = 500  # OpenAI rate limits for GENERATION_MODEL
+EXTRACT_TOKENS_PER_MINUTE = 30000
+
+MANIFEST_PATH = "example/data/graph_manifest.json"   # per-article build state; None rebuilds everything
+
+PATHS_DIR = "example/data/paths"   # precomputed seed->Myth paths for the "precomputed" retriever; None skips
+PATH_MAX_HOPS = 3                  # keep in sync with response_generation's MAX_HOPS / EXPANSION
+PATH_EXPANSION = "shortest"
+PATH_MAX_PATHS = 200
+
+SNAPSHOT_DIR = "example/data/snapshot"   # CSR/NumPy graph for response_generation's "snapshot" mode; None skips
+
+EMBED_STORE_PATH = "example/data/embeddings.sqlite"
+EMBED_STORE_MAX_AGE_DAYS = 30   # prune vectors not reused for this long
+
 
 # ---------------- UTIL ----------------
 def close_driver(driver: Driver) -> None:
@@ -42,12 +75,23 @@ def main():
         return
     
     llm = OpenAILLM(model_name=GENERATION_MODEL, api_key=OPENAI_API_KEY)
-    extract_data(llm, src_path, dst_path, 1)
+    chunker = get_chunker(CHUNKER, max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS)
+    extract_data(llm, src_path, dst_path, 1, chunker=chunker, max_workers=EXTRACT_WORKERS, requests_per_minute=EXTRACT_REQUESTS_PER_MINUTE, tokens_per_minute=EXTRACT_TOKENS_PER_MINUTE)
 
     driver = GraphDatabase.driver(URI, auth=AUTH)
     embedder = OpenAIEmbeddings(model=EMBED_MODEL, api_key=OPENAI_API_KEY)
+    store = EmbeddingStore(EMBED_STORE_PATH)
     # clear_database(driver)
-    build_database(driver, dst_path, embedder, EMBED_DIMS, SEED_LABEL, INDEX_NAME)
+    build_database(driver, dst_path, embedder, EMBED_DIMS, VECTOR_INDEXES, BATCH_SIZE, EMBED_BATCH_SIZE, EMBED_WORKERS, store, MANIFEST_PATH, EMBED_INT8)
+    if PATHS_DIR:
+        precompute_paths(driver, PATHS_DIR, list(VECTOR_INDEXES), PATH_MAX_HOPS, PATH_EXPANSION, PATH_MAX_PATHS)
+    if SNAPSHOT_DIR:
+        export_snapshot(driver, SNAPSHOT_DIR)
+
+    pruned = store.prune(max_age_days=EMBED_STORE_MAX_AGE_DAYS)
+    for key, stat in store.stats().items():
+        print(f"🗂️  Embedding store {key}: {stat['entries']} vectors, {stat['bytes'] / 1e6:.1f} MB ({pruned} stale pruned)")
+    store.close()
 
     close_driver(driver)
 
@@ -0,0 +1,140 @@
+import json, os, time
+import numpy as np
+from tqdm import tqdm
+from typing import Dict, List, Optional
+
+from neo4j import Driver
+
+from construct_database import batched, report_rate
+
+
+# ---------------- PRECOMPUTE PATHS ----------------
+def precompute_paths(driver: Driver, dst_dir: str, seed_labels: List[str], max_hops: int = 3, expansion: str = "shortest", max_paths: int = 200, batch_size: int = 100) -> None:
+    """
+    Enumerate every seed's candidate paths to Myth nodes once, after a build, and write them to `dst_dir`:
+    `paths.json` (node/relationship tables and per-seed paths as row indices), `embeddings.npy`
+    (float32, one row per node) and `meta.json` (graph version and settings; unchanged inputs are skipped). response_generation's "precomputed" retriever then
+    only runs the seed vector lookup online and scores these candidates in NumPy.
+    """
+    os.makedirs(dst_dir, exist_ok=True)
+    start = time.perf_counter()
+
+    version_records, _, _ = driver.execute_query("MATCH (m:GraphMeta {id: 'graph'}) RETURN m.version AS version")
+    meta = {
+        "version": version_records[0]["version"] if version_records else None,
+        "seed_labels": seed_labels,
+        "max_hops": max_hops,
+        "expansion": expansion,
+        "max_paths": max_paths,
+    }
+    if meta["version"] is not None and load_meta(dst_dir) == meta:
+        print(f"✅ Precomputed paths are up to date (version {meta['version']}).")
+        return
+
+    records, _, _ = driver.execute_query(
+        "MATCH (n) WHERE any(l IN labels(n) WHERE l IN $labels) RETURN elementId(n) AS id",
+        labels=seed_labels,
+    )
+    seed_ids = [rec["id"] for rec in records]
+
+    node_row: Dict[str, int] = {}
+    rel_row: Dict[str, int] = {}
+    nodes: List[Dict] = []
+    rels: List[Dict] = []
+    embeddings: List[Optional[List[float]]] = []
+    seeds: Dict[str, Dict[str, List[List[int]]]] = {}
+
+    query = expansion_query(max_hops, expansion)
+    with driver.session() as session, tqdm(total=len(seed_ids), desc="🧭 Precomputing paths") as pbar:
+        for batch in batched(seed_ids, batch_size):
+            results = session.run(query, ids=batch, max_paths=max_paths).data()
+
+            # Node details and embeddings are fetched once per node, not once per path through it
+            new_ids = list(dict.fromkeys(
+                nid for rec in results for p in rec["pathNodes"] for nid in p if nid not in node_row
+            ))
+            for n in session.run(NODE_DETAILS_CYPHER, ids=new_ids).data():
+                node_row[n["id"]] = len(nodes)
+                embeddings.append(n.pop("embedding"))
+                nodes.append(n)
+
+            for rec in results:
+                for p_rels in rec["pathRels"]:
+                    for r in p_rels:
+                        if r["id"] not in rel_row:
+                            rel_row[r["id"]] = len(rels)
+                            rels.append(r)
+                seeds[rec["seed"]] = {
+                    "pathNodes": [[node_row[nid] for nid in p] for p in rec["pathNodes"]],
+                    "pathRels": [[rel_row[r["id"]] for r in p] for p in rec["pathRels"]],
+                }
+            pbar.update(len(batch))
+
+    with open(os.path.join(dst_dir, "paths.json"), "w", encoding="utf-8") as file:
+        json.dump({**meta, "nodes": nodes, "rels": rels, "seeds": seeds}, file, ensure_ascii=False)
+    np.save(os.path.join(dst_dir, "embeddings.npy"), embedding_matrix(embeddings))
+    with open(os.path.join(dst_dir, "meta.json"), "w", encoding="utf-8") as file:
+        json.dump(meta, file, ensure_ascii=False, indent=2)
+
+    report_rate("seeds", len(seed_ids), time.perf_counter() - start)
+    total_paths = sum(len(s["pathNodes"]) for s in seeds.values())
+    print(f"✅ Precomputed {total_paths} paths over {len(nodes)} nodes for {len(seeds)} seeds (version {meta['version']}).")
+
+NODE_DETAILS_CYPHER = """
+UNWIND $ids AS id
+MATCH (n) WHERE elementId(n) = id
+RETURN id,
+       labels(n) AS labels,
+       coalesce(n.name, "(unnamed)") AS name,
+       coalesce(n.description, "") AS description,
+       n.embedding AS embedding
+"""
+
+def expansion_query(max_hops: int, expansion: str) -> str:
+    # Same patterns as response_generation's build_retriever_query without a seed label
+    if expansion == "shortest":
+        pattern = f"SHORTEST 1 (node)-[]->{{0,{max_hops}}}(nbr:Myth)"
+    elif expansion == "all":
+        pattern = f"(node)-[*0..{max_hops}]->(nbr:Myth)"
+    else:
+        raise ValueError(f"Unsupported expansion strategy: {expansion}")
+
+    return f"""
+    UNWIND $ids AS id
+    MATCH (node) WHERE elementId(node) = id
+    CALL (node) {{
+      MATCH p = {pattern}
+      RETURN p
+      ORDER BY length(p), elementId(nbr), [r IN relationships(p) | elementId(r)]
+      LIMIT $max_paths
+    }}
+    WITH node, collect(p) AS paths
+    RETURN elementId(node) AS seed,
+           [p IN paths | [n IN nodes(p) | elementId(n)]] AS pathNodes,
+           [p IN paths | [r IN relationships(p) | {{
+             id: elementId(r),
+             type: type(r),
+             start: elementId(startNode(r)),
+             end: elementId(endNode(r)),
+             description: coalesce(r.description, "")
+           }}]] AS pathRels
+    """
+
+
+# ---------------- UTILS ----------------
+def load_meta(dst_dir: str) -> Optional[Dict]:
+    # Written last, so it only matches when paths.json and embeddings.npy are complete
+    path = os.path.join(dst_dir, "meta.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+def embedding_matrix(embeddings: List[Optional[List[float]]]) -> np.ndarray:
+    # Missing embeddings become zero rows, which score 0.0 like the coalesce() fallbacks in Cypher
+    dims = max((len(e) for e in embeddings if e is not None), default=0)
+    matrix = np.zeros((len(embeddings), dims), dtype=np.float32)
+    for i, e in enumerate(embeddings):
+        if e is not None and len(e) == dims:
+            matrix[i] = e
+    return matrix
@@ -0,0 +1,114 @@
+import math, re
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from neo4j import Driver
+
+
+# ---------------- BLOCKED RESOLUTION ----------------
+def resolve_label(driver: Driver, label: str, threshold: float = 0.95, block_threshold: float = 0.5, since: Optional[int] = None, batch_size: int = 100) -> Dict[str, int]:
+    """
+    Merge near-duplicate `label` nodes by name without all-pairs comparison:
+    names are blocked on rare character trigrams (prefix filtering at `block_threshold` Jaccard),
+    only candidate pairs are scored, and clusters are merged with APOC in batches.
+    With `since` (ms timestamp), only pairs involving a node created at or after it are considered.
+    """
+    records, _, _ = driver.execute_query(
+        f"MATCH (n:`{label}`) WHERE n.name IS NOT NULL "
+        "RETURN elementId(n) AS id, n.name AS name, coalesce(n.created_at, 0) AS created_at"
+    )
+    nodes = [(rec["id"], normalize_name(rec["name"]), rec["created_at"]) for rec in records]
+    recent = None if since is None else {nid for nid, _, created_at in nodes if created_at >= since}
+
+    pairs = candidate_pairs({nid: name for nid, name, _ in nodes}, block_threshold)
+    if recent is not None:
+        pairs = {(a, b) for a, b in pairs if a in recent or b in recent}
+
+    names = {nid: name for nid, name, _ in nodes}
+    matched = [(a, b) for a, b in pairs if similarity(names[a], names[b]) >= threshold]
+    clusters = [sorted(c) for c in union_find(matched) if len(c) > 1]
+
+    merged = 0
+    for i in range(0, len(clusters), batch_size):
+        merged += merge_clusters(driver, clusters[i : i + batch_size])
+    return {
+        "nodes": len(nodes),
+        "pairs_considered": len(pairs),
+        "pairs_matched": len(matched),
+        "merges": merged,
+    }
+
+def merge_clusters(driver: Driver, clusters: List[List[str]]) -> int:
+    # The oldest node of each cluster survives and keeps its properties
+    records, _, _ = driver.execute_query(
+        """
+        UNWIND $clusters AS ids
+        CALL (ids) {
+          MATCH (n) WHERE elementId(n) IN ids
+          WITH n ORDER BY coalesce(n.created_at, 0), elementId(n)
+          RETURN collect(n) AS nodes
+        }
+        WITH nodes WHERE size(nodes) > 1
+        CALL apoc.refactor.mergeNodes(nodes, {properties: 'discard', mergeRels: true})
+        YIELD node
+        RETURN count(node) AS merged
+        """,
+        clusters=clusters,
+    )
+    return records[0]["merged"] if records else 0
+
+
+# ---------------- BLOCKING ----------------
+def candidate_pairs(names: Dict[str, str], block_threshold: float) -> Set[Tuple[str, str]]:
+    # Prefix filtering: two names with trigram Jaccard >= t must share one of their
+    # |x| - ceil(t * |x|) + 1 rarest trigrams, so only those are indexed
+    grams = {nid: trigrams(name) for nid, name in names.items()}
+    freq = Counter(g for gs in grams.values() for g in gs)
+
+    blocks: Dict[str, List[str]] = defaultdict(list)
+    for nid, gs in grams.items():
+        ordered = sorted(gs, key=lambda g: (freq[g], g))
+        prefix = len(ordered) - math.ceil(block_threshold * len(ordered)) + 1
+        for g in ordered[:prefix]:
+            blocks[g].append(nid)
+
+    pairs = set()
+    for members in blocks.values():
+        for a, b in combinations(sorted(members), 2):
+            pairs.add((a, b))
+    return pairs
+
+def union_find(pairs: Iterable[Tuple[str, str]]) -> List[Set[str]]:
+    parent: Dict[str, str] = {}
+
+    def find(x: str) -> str:
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in pairs:
+        parent[find(a)] = find(b)
+    clusters: Dict[str, Set[str]] = defaultdict(set)
+    for x in list(parent):
+        clusters[find(x)].add(x)
+    return list(clusters.values())
+
+
+# ---------------- UTILS ----------------
+def normalize_name(name: str) -> str:
+    # "SmokingTiger" / "Smoking tiger" -> "smoking tiger"
+    words = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", str(name))
+    return " ".join(re.findall(r"[a-z0-9]+", words.lower()))
+
+def trigrams(name: str) -> Set[str]:
+    padded = f"^{name}$"
+    return {padded[i : i + 3] for i in range(max(1, len(padded) - 2))}
+
+def similarity(a: str, b: str) -> float:
+    if a == b:
+        return 1.0
+    return SequenceMatcher(None, a, b).ratio()
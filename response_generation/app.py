@@ -0,0 +1,81 @@
+import time
+import gradio as gr
+from openai import OpenAI
+from typing import Any, Iterator, Tuple
+
+from neo4j_graphrag.embeddings.openai import OpenAIEmbeddings
+
+from cache import ImageCache
+from handle_query import embed_caption, img2caption, retrieve_context, stream_answer
+from images import ImageProcessor
+from main import CAP_MODEL, CONTEXT_ASSEMBLY, CONTEXT_TOKEN_BUDGET, EMBED_DIMS, GEN_MODEL, IMAGE_FORMAT, IMAGE_MAX_DIM, IMAGE_QUALITY, close_driver, load_resources
+from retrieval_cache import RetrievalCache
+
+
+# ---------------- CONFIG ----------------
+APP_CONCURRENCY = 8    # requests answered at once; others wait in Gradio's queue
+APP_QUEUE_SIZE = 64    # waiting requests before new ones are turned away
+SERVER_NAME = "0.0.0.0"
+SERVER_PORT = 7860
+
+
+# ---------------- APP ----------------
+def build_app(embedder: OpenAIEmbeddings, retriever: Any, llm: OpenAI, cache: ImageCache, retrieval_cache: RetrievalCache, processor: ImageProcessor) -> gr.Blocks:
+    # Resources are created once at startup and shared by every request
+    def answer(image_path: str, query: str) -> Iterator[Tuple[str, str, str, str]]:
+        if not image_path or not query or not query.strip():
+            raise gr.Error("Please upload a painting and enter a question.")
+
+        start = time.perf_counter()
+        caption = img2caption(llm, CAP_MODEL, image_path, cache, processor)
+        caption_emb = embed_caption(embedder, caption, image_path, cache, EMBED_DIMS)
+        context_list, stats = retrieve_context(retriever, caption, caption_emb, cache=retrieval_cache, assemble=CONTEXT_ASSEMBLY, token_budget=CONTEXT_TOKEN_BUDGET)
+        context_text = "\n\n".join(context_list)
+        retrieved = time.perf_counter() - start
+        source = "cache" if stats["retrieval_cached"] else "graph"
+        yield "", caption, context_text, f"⏳ Context retrieved from {source} in {retrieved:.1f}s, generating..."
+
+        response, first_token = "", None
+        for delta in stream_answer(llm, GEN_MODEL, query, context_list, image_path, cache, processor):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            response += delta
+            yield response, caption, context_text, f"⏳ First token after {first_token:.1f}s"
+
+        total = time.perf_counter() - start
+        yield response, caption, context_text, f"✅ Retrieval {retrieved:.1f}s, first token {first_token or total:.1f}s, total {total:.1f}s"
+
+    with gr.Blocks(title="FolkArtRAG") as demo:
+        gr.Markdown("## FolkArtRAG\nAsk about a Korean folk painting.")
+        with gr.Row():
+            with gr.Column():
+                image = gr.Image(type="filepath", label="Painting")
+                query = gr.Textbox(label="Question", lines=2)
+                submit = gr.Button("Ask", variant="primary")
+            with gr.Column():
+                response = gr.Markdown(label="Answer")
+                status = gr.Markdown()
+                with gr.Accordion("Caption and retrieved context", open=False):
+                    caption = gr.Textbox(label="Caption", interactive=False)
+                    context = gr.Textbox(label="Context", lines=12, interactive=False)
+
+        outputs = [response, caption, context, status]
+        submit.click(answer, inputs=[image, query], outputs=outputs)
+        query.submit(answer, inputs=[image, query], outputs=outputs)
+    return demo
+
+
+# ---------------- MAIN ----------------
+def main():
+    driver, embedder, retriever, llm, cache, retrieval_cache = load_resources()
+    try:
+        processor = ImageProcessor(IMAGE_MAX_DIM, IMAGE_FORMAT, IMAGE_QUALITY)
+        demo = build_app(embedder, retriever, llm, cache, retrieval_cache, processor)
+        demo.queue(max_size=APP_QUEUE_SIZE, default_concurrency_limit=APP_CONCURRENCY)
+        demo.launch(server_name=SERVER_NAME, server_port=SERVER_PORT)
+    finally:
+        close_driver(driver)
+
+
+if __name__ == "__main__":
+    main()
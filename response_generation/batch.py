@@ -0,0 +1,138 @@
+import json, os, time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from openai import OpenAI
+from tqdm import tqdm
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+from neo4j_graphrag.embeddings.openai import OpenAIEmbeddings
+
+from cache import ImageCache
+from concurrency import RateLimiter
+from handle_query import embed_caption, generate_answer, img2caption, retrieve_context
+from images import ImageProcessor
+from retrieval_cache import RetrievalCache
+
+
+STAGES = ["caption", "embedding", "retrieval", "generation"]
+
+
+# ---------------- QUERY PROCESSING ----------------
+def make_stages(llm: OpenAI, gen_model: str, cap_model: str, embedder: OpenAIEmbeddings, retriever: Any, cache: Optional[ImageCache] = None, embed_dims: Optional[int] = None, retrieval_cache: Optional[RetrievalCache] = None, assemble: bool = False, token_budget: Optional[int] = None, processor: Optional[ImageProcessor] = None, limits: Optional[Dict[str, RateLimiter]] = None) -> Dict[str, Callable[[Dict], Dict]]:
+    # The steps of generate_response, each taking the job so far and returning the fields it adds.
+    # `limits` are taken per stage only on real API / graph calls, so cache hits are not throttled
+    limits = limits or {}
+
+    def caption(job: Dict) -> Dict:
+        return {"caption": img2caption(llm, cap_model, job["image"], cache, processor, limits.get("caption"))}
+
+    def embedding(job: Dict) -> Dict:
+        return {"caption_emb": embed_caption(embedder, job["caption"], job["image"], cache, embed_dims, limits.get("embedding"))}
+
+    def retrieval(job: Dict) -> Dict:
+        context_list, stats = retrieve_context(retriever, job["caption"], job["caption_emb"], cache=retrieval_cache, assemble=assemble, token_budget=token_budget, limiter=limits.get("retrieval"))
+        return {"retrieved": context_list, **stats}
+
+    def generation(job: Dict) -> Dict:
+        return {"response": generate_answer(llm, gen_model, job["query"], job["retrieved"], job["image"], cache, processor, limits.get("generation"))}
+
+    return {"caption": caption, "embedding": embedding, "retrieval": retrieval, "generation": generation}
+
+def make_processor(stages: Dict[str, Callable[[Dict], Dict]]) -> Callable[[Dict], Dict]:
+    # Run all stages in sequence, with a timing per stage
+    def process(job: Dict) -> Dict:
+        result: Dict[str, Any] = {"timings": {}}
+        for stage in STAGES:
+            start = time.perf_counter()
+            result.update(stages[stage]({**job, **result}))
+            result["timings"][stage] = time.perf_counter() - start
+        return result
+
+    return process
+
+
+# ---------------- BATCH RUNNER ----------------
+def batch_jobs(all_input: List[Dict]) -> List[Dict]:
+    # One job per (image, query); the key identifies it across interrupted runs
+    return [
+        {"key": f"{item['image']}::{query}", "image": item["image"], "query": query}
+        for item in all_input
+        for query in item["query"]
+    ]
+
+def run_batch(jobs: List[Dict], run: Callable[[List[Dict]], Iterable[Dict]], dst_path: str) -> Counter:
+    """
+    Run `jobs` through `run` (e.g. `pooled(process)` or `StagedPipeline.run`) and append one JSON line
+    per finished job to `dst_path`, in completion order.
+    Jobs already completed in `dst_path` are skipped, so an interrupted run resumes where it stopped;
+    failed jobs are recorded with an `error` and retried on the next run.
+    """
+    done = completed_keys(dst_path)
+    pending = [job for job in jobs if job["key"] not in done]
+    if done:
+        print(f"🔁 Resuming: {len(jobs) - len(pending)} queries already done, {len(pending)} to run")
+
+    counts = Counter()
+    os.makedirs(os.path.dirname(dst_path) or ".", exist_ok=True)
+    with open(dst_path, "a+b") as out:
+        # Terminate a line cut off by an interruption so the next record starts cleanly
+        # (binary mode: the cut may fall inside a multi-byte character)
+        out.seek(0, os.SEEK_END)
+        if out.tell() > 0:
+            out.seek(-1, os.SEEK_END)
+            if out.read(1) != b"\n":
+                out.write(b"\n")
+
+        for record in tqdm(run(pending), total=len(pending), desc="Processing queries"):
+            record.pop("caption_emb", None)
+            out.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+            out.flush()
+            counts["failed" if "error" in record else "completed"] += 1
+    return counts
+
+def pooled(process: Callable[[Dict], Dict], max_workers: int = 8) -> Callable[[List[Dict]], Iterator[Dict]]:
+    # Each worker takes one job through every stage; see pipeline.py for per-stage pools
+    def run(jobs: List[Dict]) -> Iterator[Dict]:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(run_job, process, job) for job in jobs]
+            for future in as_completed(futures):
+                yield future.result()
+    return run
+
+def run_job(process: Callable[[Dict], Dict], job: Dict) -> Dict:
+    start = time.perf_counter()
+    try:
+        record = {**job, **process(job)}
+    except Exception as e:
+        record = {**job, "error": f"{type(e).__name__}: {e}"}
+    record["time"] = time.perf_counter() - start
+    return record
+
+
+# ---------------- RESULTS ----------------
+def iter_records(dst_path: str):
+    if not os.path.exists(dst_path):
+        return
+    with open(dst_path, "rb") as file:
+        for line in file:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue   # partial line from an interrupted run, possibly cut inside a character
+
+def completed_keys(dst_path: str) -> Set[str]:
+    return {rec["key"] for rec in iter_records(dst_path) if "error" not in rec}
+
+def collect_results(dst_path: str, all_input: List[Dict]) -> List[Dict]:
+    # Regroup the JSONL records per image, in input order, in the shape main.py has always written
+    latest = {rec["key"]: rec for rec in iter_records(dst_path) if "error" not in rec}
+    all_output = []
+    for job_group in all_input:
+        qa_pairs = []
+        for job in batch_jobs([job_group]):
+            rec = latest.get(job["key"])
+            if rec is None:
+                continue
+            qa_pairs.append({k: v for k, v in rec.items() if k not in ("key", "image")})
+        all_output.append({"image": job_group["image"], "output": qa_pairs})
+    return all_output
@@ -0,0 +1,129 @@
+import hashlib, json, os, threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+# ---------------- IMAGE CACHE ----------------
+class ImageCache:
+    """
+    Content-hash keyed cache for per-image work (data URL, caption, caption embedding).
+    Entries live in a bounded LRU in memory and, if `cache_dir` is set, as one JSON file per image on disk.
+    """
+
+    def __init__(self, max_entries: int = 128, cache_dir: Optional[str] = None, max_disk_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._digests: Dict[Tuple[str, int, int], str] = {}
+        self._inflight: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get_or_compute(self, image_path: str, field: str, compute: Callable[[], Any]) -> Any:
+        key = self.digest(image_path)
+        with self._lock:
+            entry = self._load(key)
+            if field in entry:
+                self.hits += 1
+                return entry[field]
+            inflight = self._inflight.setdefault((key, field), threading.Lock())
+
+        # Concurrent misses on the same image wait for one computation instead of repeating it
+        with inflight:
+            with self._lock:
+                entry = self._load(key)
+                if field in entry:
+                    self.hits += 1
+                    return entry[field]
+                self.misses += 1
+
+            value = compute()
+            with self._lock:
+                entry = self._load(key)
+                entry[field] = value
+                self._save(key, entry)
+                self._inflight.pop((key, field), None)
+        return value
+
+    def digest(self, image_path: str) -> str:
+        # Re-hash only when the file on disk changed
+        stat = os.stat(image_path)
+        stamp = (os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            key = self._digests.get(stamp)
+        if key is None:
+            key = file_digest(image_path)
+            with self._lock:
+                self._digests[stamp] = key
+        return key
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+        }
+
+    def _load(self, key: str) -> Dict[str, Any]:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        entry = {}
+        path = self._disk_path(key)
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    entry = json.load(file)
+            except (OSError, json.JSONDecodeError):
+                entry = {}
+        self._remember(key, entry)
+        return entry
+
+    def _save(self, key: str, entry: Dict[str, Any]) -> None:
+        self._remember(key, entry)
+        path = self._disk_path(key)
+        if not path:
+            return
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(entry, file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._prune_disk()
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _prune_disk(self) -> None:
+        files = [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(".json")
+        ]
+        if len(files) <= self.max_disk_entries:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_disk_entries]:
+            os.remove(path)
+
+    def _disk_path(self, key: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+
+# ---------------- UTILS ----------------
+def file_digest(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
@@ -0,0 +1,36 @@
+import threading, time
+from collections import deque
+from typing import Optional
+
+
+# ---------------- RATE LIMIT ----------------
+# Same limiter as graph_construction/concurrency.py; the script directories do not import each other
+class RateLimiter:
+    """
+    Thread-safe sliding one-minute budget for requests and (estimated) tokens.
+    `acquire()` blocks until the call fits in both budgets; `None` disables a budget.
+    """
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None) -> None:
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._events = deque()
+        self._tokens = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._events and now - self._events[0][0] >= 60.0:
+                    _, used = self._events.popleft()
+                    self._tokens -= used
+                fits_requests = self.requests_per_minute is None or len(self._events) < self.requests_per_minute
+                # A single oversized call is let through once the window is empty
+                fits_tokens = self.tokens_per_minute is None or not self._events or self._tokens + tokens <= self.tokens_per_minute
+                if fits_requests and fits_tokens:
+                    self._events.append((now, tokens))
+                    self._tokens += tokens
+                    return
+                wait = 60.0 - (now - self._events[0][0])
+            time.sleep(max(wait, 0.05))
@@ -0,0 +1,108 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+
+# ---------------- CONTEXT ASSEMBLY ----------------
+def assemble_context(items: List[Dict], token_budget: Optional[int] = None) -> Tuple[str, Dict]:
+    """
+    Merge retrieved items (formatter metadata with `nodes` / `rels`) into one deduplicated context,
+    keeping each node's and relationship's best rank across items. Nodes are added in rank order, each
+    followed by the best-ranked relationships it completes, until `token_budget` would be exceeded.
+    """
+    nodes: Dict[str, Dict] = {}
+    rels: Dict[str, Dict] = {}
+    for item in items:
+        for n in item.get("nodes", []):
+            if n["id"] not in nodes or n["rank"] > nodes[n["id"]]["rank"]:
+                nodes[n["id"]] = n
+        for r in item.get("rels", []):
+            if r["id"] not in rels or r["rank"] > rels[r["id"]]["rank"]:
+                rels[r["id"]] = r
+
+    ranked_nodes = sorted(nodes.values(), key=lambda n: n["rank"], reverse=True)
+    ranked_rels = sorted(rels.values(), key=lambda r: r["rank"], reverse=True)
+    id2name = {n["id"]: n["name"] for n in ranked_nodes}
+
+    kept_nodes: List[Dict] = []
+    kept_rels: List[Dict] = []
+    kept_ids = set()
+    pending_rels = list(ranked_rels)
+    tokens = count_tokens(render_context([], [], id2name))
+    truncated = False
+    for n in ranked_nodes:
+        cost = count_tokens(format_node(n)) + 1
+        if token_budget is not None and tokens + cost > token_budget:
+            truncated = True
+            break
+        kept_nodes.append(n)
+        kept_ids.add(n["id"])
+        tokens += cost
+
+        # Relationships become renderable once both endpoints are in
+        for r in [r for r in pending_rels if r["start"] in kept_ids and r["end"] in kept_ids]:
+            pending_rels.remove(r)
+            cost = count_tokens(format_rel(r, id2name)) + 1
+            if token_budget is not None and tokens + cost > token_budget:
+                truncated = True
+                continue
+            kept_rels.append(r)
+            tokens += cost
+
+    kept_rels.sort(key=lambda r: r["rank"], reverse=True)
+    text = render_context(kept_nodes, kept_rels, id2name)
+    stats = {
+        "context_tokens": count_tokens(text),
+        "context_nodes": len(kept_nodes),
+        "context_rels": len(kept_rels),
+        "context_truncated": truncated,
+    }
+    return text, stats
+
+
+# ---------------- RENDERING ----------------
+def clean_text(s) -> str:
+    # do all escaping outside f-strings
+    return "" if not s else str(s).replace("\n", " ").replace("\r", " ").strip()
+
+def format_node(n: Dict) -> str:
+    labels = ":".join(n["labels"])
+    return (
+        f"{labels}: {n['name']}"
+        f" (rank={float(n['rank'])})"
+        f"\n- {clean_text(n['description'])}"
+    )
+
+def format_rel(r: Dict, id2name: Dict[str, str]) -> str:
+    return (
+        f"{id2name[r['start']]} -[{r['type']}]-> {id2name[r['end']]}"
+        f" (rank={float(r['rank'])})"
+        f"\n- {clean_text(r['description'])}"
+    )
+
+def render_context(nodes: List[Dict], rels: List[Dict], id2name: Dict[str, str]) -> str:
+    return (
+        "GRAPH NODES:\n" + "\n".join(format_node(n) for n in nodes) +
+        "\n\nGRAPH RELATIONSHIPS:\n" + "\n".join(format_rel(r, id2name) for r in rels)
+    )
+
+
+# ---------------- TOKENS ----------------
+def count_tokens(text: str) -> int:
+    encoding = get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return estimate_tokens(text)
+
+def estimate_tokens(text: str) -> int:
+    # Rough budget: ~4 ASCII chars per token, ~1 token per Hangul/CJK char
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+@lru_cache(maxsize=1)
+def get_encoding():
+    # tiktoken is optional; fall back to the character heuristic without it
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
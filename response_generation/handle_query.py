@@ -1,7 +1,7 @@
-import base64, json, os
+import hashlib, json, os, time
 from datetime import datetime
 from openai import OpenAI
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from neo4j import GraphDatabase, Record
 from neo4j_graphrag.embeddings.openai import OpenAIEmbeddings
@@ -9,87 +9,121 @@ from neo4j_graphrag.embeddings.openai import OpenAIEmbeddings
 from neo4j_graphrag.retrievers import VectorCypherRetriever
 from neo4j_graphrag.types import RetrieverResultItem
 
-from prompts import IMG2GRAPH_PROMPT, IMG2TEXT_PROMPT, RETRIEVAL_CYPHER, GENERATION_PROMPT
+from cache import ImageCache
+from concurrency import RateLimiter
+from context import assemble_context, render_context
+from images import ImageProcessor, detect_mime, to_data_url
+from prompts import IMG2GRAPH_PROMPT, IMG2TEXT_PROMPT, EXPANSION_CYPHER, RETRIEVAL_CYPHER, CANDIDATE_CYPHER, GENERATION_PROMPT
+from precomputed import PrecomputedRetriever
+from rerank import RerankingRetriever
+from retrieval_cache import RetrievalCache
+from snapshot import SnapshotRetriever
 
 
 # ---------------- CREATE RETRIEVER ----------------
-def create_retriever(driver: GraphDatabase.driver, embedder: OpenAIEmbeddings, seed_label: str, index_name: str) -> VectorCypherRetriever:
-    return VectorCypherRetriever(
-        driver=driver,
-        index_name=index_name,
-        retrieval_query=build_retriever_query(seed_label),
-        embedder=embedder,
-        result_formatter=formatter,
-    )
+def create_retriever(driver: GraphDatabase.driver, embedder: OpenAIEmbeddings, seed_label: str, index_name: str, mode: str = "cypher", max_hops: int = 3, expansion: str = "shortest", seed_indexes: Optional[List[str]] = None, embedding_property: str = "embedding", paths_dir: Optional[str] = None, snapshot_dir: Optional[str] = None) -> VectorCypherRetriever | RerankingRetriever | PrecomputedRetriever | SnapshotRetriever:
+    # "cypher":      score paths inside RETRIEVAL_CYPHER
+    # "numpy":       fetch candidate paths and embeddings, score them client-side
+    # "precomputed": vector seed lookup only; candidate paths come from graph_construction's precompute_paths in paths_dir
+    # "snapshot":    no Neo4j at all; seeds, expansion and scoring run over graph_construction's export_snapshot in snapshot_dir
+    # seed_indexes: seed from several per-label indexes (e.g. Concept, Myth) instead of seed_label's only
+    # embedding_property: node property the "numpy" mode scores with, e.g. the compact "embedding_int8"
+    if mode == "snapshot":
+        if not snapshot_dir:
+            raise ValueError("The 'snapshot' retrieval mode requires snapshot_dir.")
+        return SnapshotRetriever(
+            snapshot_dir=snapshot_dir,
+            seed_labels=None if seed_indexes else [seed_label],
+            max_hops=max_hops,
+            expansion=expansion,
+            embedder=embedder,
+            result_formatter=formatter,
+        )
+    if mode == "precomputed":
+        if not paths_dir:
+            raise ValueError("The 'precomputed' retrieval mode requires paths_dir.")
+        return PrecomputedRetriever(
+            driver=driver,
+            index_name=seed_indexes or index_name,
+            paths_dir=paths_dir,
+            embedder=embedder,
+            result_formatter=formatter,
+        )
+    if seed_indexes:
+        if mode != "numpy":
+            raise ValueError("Seeding from several vector indexes requires the 'numpy' retrieval mode.")
+        return RerankingRetriever(
+            driver=driver,
+            index_name=seed_indexes,
+            retrieval_query=build_retriever_query(None, cypher=CANDIDATE_CYPHER, max_hops=max_hops, expansion=expansion, embedding_property=embedding_property),
+            embedder=embedder,
+            result_formatter=formatter,
+        )
+    if mode == "cypher":
+        return VectorCypherRetriever(
+            driver=driver,
+            index_name=index_name,
+            retrieval_query=build_retriever_query(seed_label, max_hops=max_hops, expansion=expansion),
+            embedder=embedder,
+            result_formatter=formatter,
+        )
+    if mode == "numpy":
+        return RerankingRetriever(
+            driver=driver,
+            index_name=index_name,
+            retrieval_query=build_retriever_query(seed_label, cypher=CANDIDATE_CYPHER, max_hops=max_hops, expansion=expansion, embedding_property=embedding_property),
+            embedder=embedder,
+            result_formatter=formatter,
+        )
+    raise ValueError(f"Unsupported retrieval mode: {mode}")
 
-def build_retriever_query(seed_label: str, directed: bool=True) -> str:
+def build_retriever_query(seed_label: Optional[str], directed: bool=True, cypher: str=RETRIEVAL_CYPHER, max_hops: int=3, expansion: str="shortest", embedding_property: str="embedding") -> str:
+    # Without a seed label, seeds may be any entity; a Myth seed is its own zero-length path
     arrow = "->" if directed else "-"
-    pattern = f"(node:{seed_label})-[*1..]{arrow}(nbr:Myth)"
+    seed = f"(node:{seed_label})" if seed_label else "(node)"
+    min_hops = 1 if seed_label else 0
+    if expansion == "shortest":
+        # One shortest path per reachable Myth, found breadth-first up to max_hops
+        pattern = f"SHORTEST 1 {seed}-[]{arrow}{{{min_hops},{max_hops}}}(nbr:Myth)"
+    elif expansion == "all":
+        pattern = f"{seed}-[*{min_hops}..{max_hops}]{arrow}(nbr:Myth)"
+    else:
+        raise ValueError(f"Unsupported expansion strategy: {expansion}")
 
-    # Use a marker __PATTERN__ we replace below (avoid f-strings to keep { } intact)
-    cypher = RETRIEVAL_CYPHER
-    return cypher.replace("__PATTERN__", pattern)
+    # Use markers __EXPANSION__/__PATTERN__ we replace below (avoid f-strings to keep { } intact)
+    return (
+        cypher.replace("__EXPANSION__", EXPANSION_CYPHER.replace("__PATTERN__", pattern))
+              .replace("__EMBEDDING__", embedding_property)
+    )
 
 
 def formatter(rec: Record) -> RetrieverResultItem:
-    def clean_text(s):
-        # do all escaping outside f-strings
-        return "" if not s else str(s).replace("\n", " ").replace("\r", " ").strip()
-
     nodes = rec["nodes"]
     rels  = rec["rels"]
-    id2name  = {}
-    id2label = {}
-
-    text_nodes = []
-    for n in nodes:
-        nid     = n["id"]
-        labels  = ":".join(n["labels"])
-        name    = n["name"]
-        desc    = clean_text(n["description"])
-        rank    = float(n["rank"])
-
-        text_nodes.append(
-            f"{labels}: {name}"
-            f" (rank={rank})"
-            f"\n- {desc}"
-        )
-        id2name[nid] = name
-        id2label[nid] = labels
-
-    text_rels = []
-    for r in rels:
-        # rid         = r["id"]
-        rtype       = r["type"]
-        start_name  = id2name[r["start"]]
-        end_name    = id2name[r["end"]]
-        rdesc       = clean_text(r["description"])
-        rrank       = float(r["rank"])
-
-        text_rels.append(
-            f"{start_name} -[{rtype}]-> {end_name}"
-            f' (rank={rrank})'
-            f"\n- {rdesc}"
-        )
-
-    text_context = (
-        "GRAPH NODES:\n" + "\n".join(text_nodes) +
-        "\n\nGRAPH RELATIONSHIPS:\n" + "\n".join(text_rels)
-    )
+    id2name = {n["id"]: n["name"] for n in nodes}
 
     return RetrieverResultItem(
-        content=text_context,
-        # metadata={
-        #     "node_count": len(nodes),
-        #     "rel_count": len(rels),
-        #     "nodes": nodes,
-        #     "relations": rels,
-        # },
+        content=render_context(nodes, rels, id2name),
+        metadata={
+            "expanded_paths": int(rec.get("expanded") or 0),
+            # Structured copy for assemble_context
+            "nodes": [dict(n) for n in nodes],
+            "rels": [dict(r) for r in rels],
+        },
     )
 
 
 # ---------------- IMG TO CAPTION ----------------
-def img2caption(llm: OpenAI, model: str, image_path: str) -> str:
+def img2caption(llm: OpenAI, model: str, image_path: str, cache: Optional[ImageCache] = None, processor: Optional[ImageProcessor] = None, limiter: Optional[RateLimiter] = None) -> str:
+    # `limiter` is taken only when the caption model is actually called, not on cache hits
+    if cache is not None:
+        # The encoded image is cached too, and shared with the generation call
+        return cache.get_or_compute(image_path, f"caption:{model}", lambda: caption_image(llm, model, encode_image(image_path, cache, processor), limiter))
+    return caption_image(llm, model, encode_image(image_path, None, processor), limiter)
+
+def caption_image(llm: OpenAI, model: str, image_url: str, limiter: Optional[RateLimiter] = None) -> str:
+    if limiter is not None:
+        limiter.acquire()
     content = [
         {
             "type": "text",
@@ -97,7 +131,7 @@ def img2caption(llm: OpenAI, model: str, image_path: str) -> str:
         },
         {
             "type": "image_url",
-            "image_url": {"url": encode_image(image_path)},
+            "image_url": {"url": image_url},
         },
     ]
     result = llm.chat.completions.create(
@@ -109,29 +143,91 @@ def img2caption(llm: OpenAI, model: str, image_path: str) -> str:
     )
     return result.choices[0].message.content.strip()
 
+def embed_caption(embedder: OpenAIEmbeddings, caption: str, image_path: str, cache: Optional[ImageCache] = None, dimensions: Optional[int] = None, limiter: Optional[RateLimiter] = None) -> List[float]:
+    # `dimensions` must match the graph's vector indexes when they were built reduced
+    kwargs = {"dimensions": dimensions} if dimensions else {}
+
+    def embed() -> List[float]:
+        if limiter is not None:
+            limiter.acquire()
+        return embedder.embed_query(caption, **kwargs)
+
+    if cache is not None:
+        # Keyed by the caption text too, so a caption from another CAP_MODEL never reuses this embedding
+        caption_hash = hashlib.sha256(caption.encode("utf-8")).hexdigest()[:16]
+        field = f"embedding:{embedder.model}" + (f":{dimensions}" if dimensions else "") + f":{caption_hash}"
+        return cache.get_or_compute(image_path, field, embed)
+    return embed()
+
 
 # ---------------- RETRIEVAL & GENERATION ----------------
-def retrieve_context(retriever: VectorCypherRetriever, query: str, query_emb: list[float], top_k: int=5, per_seed_limit: int=10) -> list[str]:
-    results = retriever.search(
-        query_text=query,
-        top_k=top_k,
-        query_params={
-            "lambda": 0.5,                      # similarity vs. seed score
-            "per_seed_limit": per_seed_limit,   # limit kept paths per seed
-            "q_embed": query_emb,               # query embedding
-        },
-    )
-    # print(f"Retrieved {len(results.items)} context items.")
-    return [item.content for item in results.items]
+def retrieve_context(retriever: VectorCypherRetriever | RerankingRetriever | PrecomputedRetriever | SnapshotRetriever, query: str, query_emb: list[float], top_k: int=5, per_seed_limit: int=10, max_paths: int=200, lam: float=0.5, cache: Optional[RetrievalCache]=None, assemble: bool=False, token_budget: Optional[int]=None, limiter: Optional[RateLimiter]=None) -> Tuple[List[str], Dict]:
+    # assemble: merge items into one deduplicated, rank-ordered context of at most token_budget tokens
+    def search() -> Tuple[List[str], Dict]:
+        if limiter is not None:
+            limiter.acquire()
+        # Pass the precomputed vector so the retriever does not embed the query text again
+        results = retriever.search(
+            query_vector=query_emb,
+            top_k=top_k,
+            query_params={
+                "lambda": lam,                      # similarity vs. seed score
+                "per_seed_limit": per_seed_limit,   # limit kept paths per seed
+                "max_paths": max_paths,             # limit expanded paths per seed
+                "q_embed": query_emb,               # query embedding
+            },
+        )
+        # print(f"Retrieved {len(results.items)} context items.")
+        stats = {
+            "expanded_paths": sum(item.metadata.get("expanded_paths", 0) for item in results.items if item.metadata),
+        }
+        if assemble:
+            text, context_stats = assemble_context([item.metadata or {} for item in results.items], token_budget)
+            return [text], {**stats, **context_stats}
+        return [item.content for item in results.items], stats
+
+    start = time.perf_counter()
+    if cache is None:
+        context_list, stats = search()
+        cached = False
+    else:
+        params = {"top_k": top_k, "per_seed_limit": per_seed_limit, "max_paths": max_paths, "lambda": lam, "assemble": assemble, "token_budget": token_budget}
+        (context_list, stats), cached = cache.get_or_retrieve(query_emb, params, search)
+    return context_list, {**stats, "retrieval_cached": cached, "retrieval_time": time.perf_counter() - start}
 
-def generate_response(llm: OpenAI, gen_model: str, cap_model: str, embedder: OpenAIEmbeddings, retriever: VectorCypherRetriever, query: str, image_path: str) -> Tuple[str, List[str], str]:
-    caption = img2caption(llm, cap_model, image_path)
+def generate_response(llm: OpenAI, gen_model: str, cap_model: str, embedder: OpenAIEmbeddings, retriever: VectorCypherRetriever | RerankingRetriever, query: str, image_path: str, cache: Optional[ImageCache] = None, embed_dims: Optional[int] = None, processor: Optional[ImageProcessor] = None) -> Tuple[str, List[str], str, Dict]:
+    caption = img2caption(llm, cap_model, image_path, cache, processor)
     # print("Caption:\n", caption)
 
     # r_query = f"Context: {caption}\n\nQuery: {query}"
     # r_query_emb = embedder.embed_query(r_query)
-    caption_emb = embedder.embed_query(caption)
-    context_list = retrieve_context(retriever, caption, caption_emb)
+    caption_emb = embed_caption(embedder, caption, image_path, cache, embed_dims)
+    context_list, stats = retrieve_context(retriever, caption, caption_emb)
+    response = generate_answer(llm, gen_model, query, context_list, image_path, cache, processor)
+    return (response, context_list, caption, stats)
+
+def generate_answer(llm: OpenAI, gen_model: str, query: str, context_list: List[str], image_path: str, cache: Optional[ImageCache] = None, processor: Optional[ImageProcessor] = None, limiter: Optional[RateLimiter] = None) -> str:
+    messages = generation_messages(query, context_list, image_path, cache, processor)
+    if limiter is not None:
+        limiter.acquire()
+    result = llm.chat.completions.create(
+        model=gen_model,
+        messages=messages,
+    )
+    return result.choices[0].message.content.strip()
+
+def stream_answer(llm: OpenAI, gen_model: str, query: str, context_list: List[str], image_path: str, cache: Optional[ImageCache] = None, processor: Optional[ImageProcessor] = None) -> Iterator[str]:
+    # Yields generated text deltas as they arrive
+    stream = llm.chat.completions.create(
+        model=gen_model,
+        messages=generation_messages(query, context_list, image_path, cache, processor),
+        stream=True,
+    )
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+def generation_messages(query: str, context_list: List[str], image_path: str, cache: Optional[ImageCache] = None, processor: Optional[ImageProcessor] = None) -> List[Dict]:
     context_text = "\n\n".join(item for item in context_list)
     # print("Retrieved:\n", context_text)
 
@@ -142,22 +238,22 @@ def generate_response(llm: OpenAI, gen_model: str, cap_model: str, embedder: Ope
         },
         {
             "type": "image_url",
-            "image_url": {"url": encode_image(image_path)},
+            "image_url": {"url": encode_image(image_path, cache, processor)},
         },
     ]
-    result = llm.chat.completions.create(
-        model=gen_model,
-        messages=[
-            {"role": "system", "content": GENERATION_PROMPT},
-            {"role": "user", "content": content},
-        ],
-    )
-    response = result.choices[0].message.content.strip()
-    return (response, context_list, caption)
+    return [
+        {"role": "system", "content": GENERATION_PROMPT},
+        {"role": "user", "content": content},
+    ]
 
 
 # ---------------- UTILS ----------------
-def encode_image(image_path: str) -> str:
+def encode_image(image_path: str, cache: Optional[ImageCache] = None, processor: Optional[ImageProcessor] = None) -> str:
+    # Without a processor the file is sent at full resolution, labelled with its detected MIME type
+    if cache is not None:
+        field = f"data_url:{processor.key}" if processor is not None else "data_url"
+        return cache.get_or_compute(image_path, field, lambda: encode_image(image_path, None, processor))
+    if processor is not None:
+        return processor.data_url(image_path)
     with open(image_path, "rb") as img_file:
-        img_str = base64.b64encode(img_file.read()).decode("utf-8")
-        return f"data:image/png;base64,{img_str}"
\ No newline at end of file
+        return to_data_url(img_file.read(), detect_mime(image_path))
\ No newline at end of file
@@ -0,0 +1,80 @@
+import base64, io, mimetypes
+from typing import Optional, Tuple
+
+from PIL import Image, ImageOps
+
+
+# Formats the vision endpoints accept as data URLs
+SUPPORTED_FORMATS = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp", "GIF": "image/gif"}
+
+
+# ---------------- IMAGE PROCESSOR ----------------
+class ImageProcessor:
+    """
+    Downscales an image so its longer side is at most `max_dim` and re-encodes it as `format`
+    ("JPEG", "WEBP", "PNG", or None to keep the source format) at `quality`.
+    `key` identifies the settings, so cached encodings are reused only for the same output.
+    """
+
+    def __init__(self, max_dim: Optional[int] = 1024, format: Optional[str] = "JPEG", quality: int = 85) -> None:
+        if format is not None and format.upper() not in SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported image format: {format}")
+        self.max_dim = max_dim
+        self.format = format.upper() if format else None
+        self.quality = quality
+
+    @property
+    def key(self) -> str:
+        return f"{self.max_dim}:{self.format}:{self.quality}"
+
+    def process(self, image_path: str) -> Tuple[bytes, str]:
+        # Returns (encoded bytes, MIME type)
+        with Image.open(image_path) as img:
+            source = img.format
+            target = self.format or (source if source in SUPPORTED_FORMATS else "PNG")
+            resize = self.max_dim is not None and max(img.size) > self.max_dim
+            if not resize and target == source:
+                # Already small enough and in the right format: send the file as is
+                with open(image_path, "rb") as file:
+                    return file.read(), SUPPORTED_FORMATS[target]
+
+            img = ImageOps.exif_transpose(img)
+            if resize:
+                img.thumbnail((self.max_dim, self.max_dim), Image.LANCZOS)
+            if target == "JPEG":
+                img = flatten(img)
+
+            buffer = io.BytesIO()
+            if target in ("JPEG", "WEBP"):
+                img.save(buffer, format=target, quality=self.quality, optimize=True)
+            else:
+                img.save(buffer, format=target, optimize=True)
+            return buffer.getvalue(), SUPPORTED_FORMATS[target]
+
+    def data_url(self, image_path: str) -> str:
+        data, mime = self.process(image_path)
+        return to_data_url(data, mime)
+
+
+# ---------------- UTILS ----------------
+def flatten(img: Image.Image) -> Image.Image:
+    # JPEG has no alpha channel; composite transparent paintings onto white
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+def detect_mime(image_path: str) -> str:
+    # Trust the file's content over its extension
+    try:
+        with Image.open(image_path) as img:
+            if img.format in SUPPORTED_FORMATS:
+                return SUPPORTED_FORMATS[img.format]
+    except OSError:
+        pass
+    return mimetypes.guess_type(image_path)[0] or "application/octet-stream"
+
+def to_data_url(data: bytes, mime: str) -> str:
+    return f"data:{mime};base64,{base64.b64encode(data).decode('utf-8')}"
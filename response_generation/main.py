@@ -1,13 +1,21 @@
-import json, os, time
+import json, os
 from dotenv import load_dotenv
 from openai import OpenAI
-from tqdm import tqdm
+from typing import Tuple
 
 from neo4j import Driver, GraphDatabase
 from neo4j_graphrag.embeddings.openai import OpenAIEmbeddings
+from neo4j_graphrag.retrievers import VectorCypherRetriever
 # from neo4j_graphrag.llm import OpenAILLM
 
-from handle_query import create_retriever, generate_response
+from batch import STAGES, batch_jobs, collect_results, make_processor, make_stages, pooled, run_batch
+from cache import ImageCache
+from concurrency import RateLimiter
+from handle_query import create_retriever
+from images import ImageProcessor
+from pipeline import StagedPipeline, print_summary
+from rerank import RerankingRetriever
+from retrieval_cache import RetrievalCache
 
 
 # ---------------- CONFIG ----------------
@@ -21,12 +29,47 @@ AUTH = (os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD"))
 
 INDEX_NAME = "Index"
 SEED_LABEL = "Form"
+SEED_INDEXES = ["Index", "ConceptIndex", "MythIndex", "JointConceptIndex"]   # per-label indexes to seed from ("numpy" only); None seeds Forms only
+RETRIEVAL_MODE = "numpy"   # "cypher" scores in RETRIEVAL_CYPHER, "numpy" reranks client-side, "precomputed" reads PATHS_DIR, "snapshot" runs in-process
+PATHS_DIR = "example/data/paths"   # written by graph_construction's precompute_paths (same MAX_HOPS / EXPANSION)
+SNAPSHOT_DIR = "example/data/snapshot"   # written by graph_construction's export_snapshot, for "snapshot" mode
+MAX_HOPS = 3               # Form -> Concept -> JointConcept -> Myth
+EXPANSION = "shortest"     # "shortest" path per Myth, or "all" paths up to MAX_HOPS
 
 EMBED_MODEL = "text-embedding-3-large"
-EMBED_DIMS = 3072
+EMBED_DIMS = 3072                 # must match graph_construction's EMBED_DIMS
+EMBEDDING_PROPERTY = "embedding"  # "embedding_int8" if the graph was built with EMBED_INT8 ("numpy" mode only)
 CAP_MODEL = "gpt-4o-mini"
 GEN_MODEL = "gpt-4o"
 
+IMAGE_CACHE_DIR = "example/cache/images"
+IMAGE_CACHE_SIZE = 128
+IMAGE_MAX_DIM = 1024    # longer side in pixels before encoding; None keeps the original size
+IMAGE_FORMAT = "JPEG"   # "JPEG", "WEBP", "PNG", or None to keep each painting's format
+IMAGE_QUALITY = 85      # JPEG / WEBP quality
+
+CONTEXT_ASSEMBLY = True      # merge the top_k items into one deduplicated context; False joins formatter texts
+CONTEXT_TOKEN_BUDGET = 2000  # max context tokens for GEN_MODEL when assembling; None is unlimited
+
+RETRIEVAL_CACHE_DIR = "example/cache/retrieval"   # None keeps results in memory only
+RETRIEVAL_CACHE_SIZE = 1024
+
+PIPELINE = True          # per-stage worker pools; False runs each query end to end on BATCH_WORKERS threads
+BATCH_WORKERS = 8        # concurrent queries; 1 runs them in sequence
+PIPELINE_WORKERS = {     # threads per stage; retrieval workers share the driver's connection pool
+    "caption": 2,
+    "embedding": 2,
+    "retrieval": 4,
+    "generation": 8,
+}
+PIPELINE_QUEUE_SIZE = 16 # jobs waiting per stage before the previous stage blocks
+STAGE_RATE_LIMITS = {    # requests per minute per stage; None is unlimited
+    "caption": 500,      # CAP_MODEL chat completions
+    "embedding": 3000,   # EMBED_MODEL
+    "retrieval": None,   # Neo4j
+    "generation": 500,   # GEN_MODEL chat completions
+}
+
 
 # ---------------- UTIL ----------------
 def close_driver(driver: Driver) -> None:
@@ -34,17 +77,30 @@ def close_driver(driver: Driver) -> None:
         driver.close()
 
 
-# ---------------- MAIN ----------------
-def main():
+def load_resources() -> Tuple[Driver, OpenAIEmbeddings, VectorCypherRetriever | RerankingRetriever, OpenAI, ImageCache, RetrievalCache]:
+    # Long-lived clients shared by every query (batch runs and app.py)
     driver = GraphDatabase.driver(URI, auth=AUTH)
     embedder = OpenAIEmbeddings(model=EMBED_MODEL, api_key=OPENAI_API_KEY)
-    retriever = create_retriever(driver, embedder, SEED_LABEL, INDEX_NAME)
+    retriever = create_retriever(driver, embedder, SEED_LABEL, INDEX_NAME, RETRIEVAL_MODE, MAX_HOPS, EXPANSION, SEED_INDEXES, EMBEDDING_PROPERTY, PATHS_DIR, SNAPSHOT_DIR)
     
     # TODO: replace caption model with LLAVA
     llm = OpenAI(api_key=OPENAI_API_KEY)
+    # Shared across queries so each image is encoded, captioned and embedded once
+    cache = ImageCache(max_entries=IMAGE_CACHE_SIZE, cache_dir=IMAGE_CACHE_DIR)
+    # Retrieval depends on the caption only, so every question on an image reuses it until the graph is rebuilt
+    namespace = f"{RETRIEVAL_MODE}:{SEED_LABEL}:{SEED_INDEXES}:{MAX_HOPS}:{EXPANSION}:{EMBEDDING_PROPERTY}"
+    version_fn = (lambda: retriever.version) if RETRIEVAL_MODE == "snapshot" else None
+    retrieval_cache = RetrievalCache(driver, namespace, RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_DIR, version_fn=version_fn)
+    return driver, embedder, retriever, llm, cache, retrieval_cache
+
+
+# ---------------- MAIN ----------------
+def main():
+    driver, embedder, retriever, llm, cache, retrieval_cache = load_resources()
     
     src_path = "example/input.json"
     dst_path = "example/output.json"
+    log_path = "example/output.jsonl"   # streamed per-query results; rerunning resumes from it
     
     if not os.path.exists(src_path):
         print(f"❗ Source file {src_path} not found. Please provide a valid source file.")
@@ -52,33 +108,25 @@ def main():
     
     with open(src_path, "r", encoding="utf-8") as src_file:
         all_input = json.load(src_file)
-        all_output = []
-
-    for input in tqdm(all_input, total=len(all_input), desc="Processing inputs"):
-        img_path = input["image"]
-        qa_pairs = []
-
-        for query in input["query"]:
-            start_time = time.time()
-            response, retrieved, caption = generate_response(llm, GEN_MODEL, CAP_MODEL, embedder, retriever, query, img_path)
-            elapsed_time = time.time() - start_time
-
-            qa_pairs.append({
-                "query": query,
-                "caption": caption,
-                "response": response,
-                "retrieved": retrieved,
-                "time": elapsed_time,
-            })
-        
-        all_output.append({
-            "image": img_path,
-            "output": qa_pairs,
-        })
+
+    limits = {stage: RateLimiter(STAGE_RATE_LIMITS.get(stage)) for stage in STAGES}
+    processor = ImageProcessor(IMAGE_MAX_DIM, IMAGE_FORMAT, IMAGE_QUALITY)
+    stages = make_stages(llm, GEN_MODEL, CAP_MODEL, embedder, retriever, cache, EMBED_DIMS, retrieval_cache, CONTEXT_ASSEMBLY, CONTEXT_TOKEN_BUDGET, processor, limits)
+    if PIPELINE:
+        pipeline = StagedPipeline([(stage, stages[stage], PIPELINE_WORKERS[stage]) for stage in STAGES], PIPELINE_QUEUE_SIZE)
+        counts = run_batch(batch_jobs(all_input), pipeline.run, log_path)
+        print_summary(pipeline.summary())
+    else:
+        counts = run_batch(batch_jobs(all_input), pooled(make_processor(stages), BATCH_WORKERS), log_path)
+    print(f"✅ {counts['completed']} queries completed, {counts['failed']} failed (see {log_path})")
     
     with open(dst_path, "w", encoding="utf-8") as dst_file:
-        json.dump(all_output, dst_file, ensure_ascii=False, indent=4)
+        json.dump(collect_results(log_path, all_input), dst_file, ensure_ascii=False, indent=4)
     
+    stats = cache.stats()
+    print(f"🗂️  Image cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
+    stats = retrieval_cache.stats()
+    print(f"🗂️  Retrieval cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate, graph version {stats['version']})")
     close_driver(driver)
 
 
@@ -0,0 +1,145 @@
+import threading, time
+from queue import Queue
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+
+_DONE = object()
+
+
+# ---------------- STAGE METRICS ----------------
+class StageMetrics:
+    """
+    Per-stage counters: service latency, time jobs waited in the stage's queue,
+    and the queue depth seen each time a worker picked up a job.
+    """
+
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self.latencies: List[float] = []
+        self.waits: List[float] = []
+        self.depths: List[int] = []
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, wait: float, depth: int, failed: bool) -> None:
+        with self._lock:
+            self.latencies.append(latency)
+            self.waits.append(wait)
+            self.depths.append(depth)
+            self.failed += failed
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        with self._lock:
+            count = len(self.latencies)
+            busy = sum(self.latencies)
+            return {
+                "workers": self.workers,
+                "processed": count,
+                "failed": self.failed,
+                "mean_s": busy / count if count else 0.0,
+                "p95_s": percentile(self.latencies, 0.95),
+                "mean_wait_s": sum(self.waits) / count if count else 0.0,
+                "mean_queue": sum(self.depths) / count if count else 0.0,
+                "max_queue": max(self.depths, default=0),
+                "utilization": busy / (self.workers * elapsed) if elapsed > 0 else 0.0,
+            }
+
+
+# ---------------- STAGED PIPELINE ----------------
+class StagedPipeline:
+    """
+    Runs jobs through named stages, each with its own worker threads fed by a bounded queue,
+    so captioning, embedding, retrieval and generation overlap across requests.
+    Full queues block the stage before them, which keeps memory flat and exposes the bottleneck
+    as the stage with the deepest queue and highest utilization.
+    """
+
+    def __init__(self, stages: List[Tuple[str, Callable[[Dict], Dict], int]], queue_size: int = 16) -> None:
+        self.stages = stages
+        self.queue_size = queue_size
+        self.metrics = {name: StageMetrics(workers) for name, _, workers in stages}
+        self.elapsed = 0.0
+
+    def run(self, jobs: List[Dict]) -> Iterator[Dict]:
+        # Yields finished jobs (with `timings`, `waits`, `time`, or `error`) in completion order
+        queues = [Queue(maxsize=self.queue_size) for _ in self.stages] + [Queue()]
+        start = time.perf_counter()
+
+        def feed() -> None:
+            for job in jobs:
+                queues[0].put({**job, "timings": {}, "waits": {}, "_start": time.perf_counter(), "_queued": time.perf_counter()})
+            for _ in range(self.stages[0][2]):
+                queues[0].put(_DONE)
+
+        threads = [threading.Thread(target=feed, daemon=True)]
+        for i, (name, fn, workers) in enumerate(self.stages):
+            remaining = [workers]
+            lock = threading.Lock()
+            next_workers = self.stages[i + 1][2] if i + 1 < len(self.stages) else 1
+            for _ in range(workers):
+                threads.append(threading.Thread(
+                    target=self._work,
+                    args=(name, fn, queues[i], queues[i + 1], remaining, lock, next_workers),
+                    daemon=True,
+                ))
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                job = queues[-1].get()
+                if job is _DONE:
+                    break
+                job["time"] = time.perf_counter() - job.pop("_start")
+                job.pop("_queued", None)
+                yield job
+        finally:
+            self.elapsed = time.perf_counter() - start
+
+    def _work(self, name: str, fn: Callable[[Dict], Dict], inbox: Queue, outbox: Queue, remaining: List[int], lock: threading.Lock, next_workers: int) -> None:
+        while True:
+            depth = inbox.qsize()
+            job = inbox.get()
+            if job is _DONE:
+                # The last worker of this stage to finish closes the next stage's queue
+                with lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    for _ in range(next_workers):
+                        outbox.put(_DONE)
+                return
+
+            if "error" not in job:
+                wait = time.perf_counter() - job["_queued"]
+                begin = time.perf_counter()
+                try:
+                    job.update(fn(job))
+                except Exception as e:
+                    job["error"] = f"{name}: {type(e).__name__}: {e}"
+                latency = time.perf_counter() - begin
+                job["timings"][name] = latency
+                job["waits"][name] = wait
+                self.metrics[name].record(latency, wait, depth, "error" in job)
+            job["_queued"] = time.perf_counter()
+            outbox.put(job)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {name: metrics.summary(self.elapsed) for name, metrics in self.metrics.items()}
+
+
+# ---------------- UTILS ----------------
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def print_summary(summary: Dict[str, Dict[str, Any]]) -> None:
+    print("📊 Pipeline stages:")
+    for name, s in summary.items():
+        print(
+            f"  {name:<10} x{s['workers']:<2} {s['processed']:>5} done, {s['failed']} failed | "
+            f"mean {s['mean_s']:.2f}s, p95 {s['p95_s']:.2f}s, wait {s['mean_wait_s']:.2f}s | "
+            f"queue mean {s['mean_queue']:.1f}, max {s['max_queue']} | util {s['utilization']:.0%}"
+        )
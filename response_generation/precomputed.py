@@ -0,0 +1,94 @@
+import json, os
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from neo4j import Driver, Record, RoutingControl
+from neo4j_graphrag.embeddings.openai import OpenAIEmbeddings
+from neo4j_graphrag.types import RetrieverResult, RetrieverResultItem
+
+from prompts import GRAPH_VERSION_CYPHER
+from rerank import rerank_candidates, seed_query
+
+
+# ---------------- PRECOMPUTED RETRIEVER ----------------
+class PrecomputedRetriever:
+    """
+    Retriever over the seed->Myth paths written by graph_construction's `precompute_paths`.
+    Online work is a single vector index call for the seeds; their candidate paths, descriptions
+    and embeddings come from the sidecar files and are scored with `rerank_candidates`.
+    Exposes the same `search()` call and formatter contract as `VectorCypherRetriever`.
+    """
+
+    def __init__(self, driver: Driver, index_name: Union[str, List[str]], paths_dir: str, embedder: Optional[OpenAIEmbeddings] = None, result_formatter: Optional[Callable[[Record], RetrieverResultItem]] = None, neo4j_database: Optional[str] = None) -> None:
+        self.driver = driver
+        self.index_name = index_name
+        self.embedder = embedder
+        self.result_formatter = result_formatter
+        self.neo4j_database = neo4j_database
+
+        with open(os.path.join(paths_dir, "paths.json"), "r", encoding="utf-8") as file:
+            data = json.load(file)
+        self.version = data["version"]
+        self.max_paths = data["max_paths"]
+        self.nodes: List[Dict] = data["nodes"]
+        self.rels: List[Dict] = data["rels"]
+        self.seeds: Dict[str, Dict[str, List[List[int]]]] = data["seeds"]
+        self.embeddings = np.load(os.path.join(paths_dir, "embeddings.npy"), mmap_mode="r")
+        self.check_version()
+
+    def check_version(self) -> bool:
+        records, _, _ = self.driver.execute_query(GRAPH_VERSION_CYPHER, database_=self.neo4j_database, routing_=RoutingControl.READ)
+        current = records[0]["version"] if records else None
+        if current != self.version:
+            print(f"⚠️ Warning: precomputed paths are from graph version {self.version}, graph is at {current}; rerun precompute_paths.")
+            return False
+        return True
+
+    def search(self, query_vector: Optional[List[float]] = None, query_text: Optional[str] = None, top_k: int = 5, query_params: Optional[Dict[str, Any]] = None) -> RetrieverResult:
+        if query_vector is None:
+            if query_text is None or self.embedder is None:
+                raise ValueError("Either query_vector or query_text with an embedder is required.")
+            query_vector = self.embedder.embed_query(query_text)
+
+        params = dict(query_params or {})
+        q_embed = params.get("q_embed")
+        if q_embed is None:
+            q_embed = query_vector
+        lam = float(params.get("lambda", 0.5))
+        per_seed_limit = int(params.get("per_seed_limit", 10))
+        max_paths = min(int(params.get("max_paths", self.max_paths)), self.max_paths)
+
+        seed_cypher, index_params = seed_query(self.index_name)
+        records, _, _ = self.driver.execute_query(
+            seed_cypher + "RETURN elementId(node) AS seed, score",
+            parameters_={**index_params, "top_k": top_k, "query_vector": query_vector},
+            database_=self.neo4j_database,
+            routing_=RoutingControl.READ,
+        )
+        candidates = [self.candidate(rec["seed"], rec["score"], max_paths) for rec in records]
+        ranked = rerank_candidates([c for c in candidates if c is not None], q_embed, lam, per_seed_limit)
+
+        formatter = self.result_formatter or (lambda rec: RetrieverResultItem(content=str(rec.data())))
+        return RetrieverResult(
+            items=[formatter(Record(rec)) for rec in ranked],
+            metadata={"__retriever": self.__class__.__name__},
+        )
+
+    def candidate(self, seed: str, score: float, max_paths: int) -> Optional[Dict]:
+        # Same shape as a CANDIDATE_CYPHER record
+        entry = self.seeds.get(seed)
+        if entry is None:
+            return None
+        path_nodes = entry["pathNodes"][:max_paths]
+        path_rels = entry["pathRels"][:max_paths]
+        node_rows = list(dict.fromkeys(row for p in path_nodes for row in p))
+        rel_rows = list(dict.fromkeys(row for p in path_rels for row in p))
+        return {
+            "seed": seed,
+            "seedScore": score,
+            "nodes": [{**self.nodes[row], "embedding": self.embeddings[row]} for row in node_rows],
+            "rels": [self.rels[row] for row in rel_rows],
+            "expanded": len(path_nodes),
+            "pathNodes": [[self.nodes[row]["id"] for row in p] for p in path_nodes],
+            "pathRels": [[self.rels[row]["id"] for row in p] for p in path_rels],
+        }
@@ -43,9 +43,19 @@ Output:
 A group of soldiers cross a river in a boat, one raising a flag while others row through icy waters.
 """
 
+EXPANSION_CYPHER = """
+CALL (node) {
+  MATCH p = __PATTERN__
+  RETURN p, nbr
+  // Prune to the shortest paths, with a stable tie-break so the kept set is the same every run
+  ORDER BY length(p), elementId(nbr), [r IN relationships(p) | elementId(r)]
+  LIMIT $max_paths
+}
+"""
+
 RETRIEVAL_CYPHER = """
 WITH node, score
-MATCH p = __PATTERN__
+__EXPANSION__
 WITH node, score AS seedScore, p, nbr,
      toFloat($lambda) AS lambda,
      coalesce($q_embed, []) AS qv
@@ -65,7 +75,8 @@ WITH node, p, nbr,
 ORDER BY nodeRank DESC
 
 // Keep top paths per seed
-WITH node, collect({ p: p, rank: nodeRank })[..$per_seed_limit] AS top
+WITH node, collect({ p: p, rank: nodeRank }) AS ranked
+WITH node, size(ranked) AS expanded, ranked[..$per_seed_limit] AS top
 
 // Aggregate best node scores
 CALL (top) {
@@ -78,7 +89,7 @@ CALL (top) {
 }
 
 // Aggregate best relationship scores
-WITH node, top, nodeRankList, coalesce($q_embed, []) AS qv
+WITH node, expanded, top, nodeRankList, coalesce($q_embed, []) AS qv
 CALL (top, qv) {
   WITH top, qv
   UNWIND top AS k2
@@ -100,15 +111,15 @@ CALL (top, qv) {
 // Materialize unique nodes/rels from top paths
 UNWIND top AS k3
 UNWIND nodes(k3.p) AS n
-WITH node, nodeRankList, relRankList, collect(DISTINCT n) AS allNodes, top
+WITH node, expanded, nodeRankList, relRankList, collect(DISTINCT n) AS allNodes, top
 
 UNWIND top AS k4
 UNWIND relationships(k4.p) AS r
-WITH node, nodeRankList, relRankList, allNodes, collect(DISTINCT r) AS allRels
+WITH node, expanded, nodeRankList, relRankList, allNodes, collect(DISTINCT r) AS allRels
 
 // Build nodes with best rank lookup
 UNWIND allNodes AS n
-WITH node, nodeRankList, relRankList, allRels, n,
+WITH node, expanded, nodeRankList, relRankList, allRels, n,
      coalesce( head([m IN nodeRankList WHERE m.nid = elementId(n) | m.rank]), 0.0 ) AS bestNodeRank
 WITH collect({
        id: elementId(n),
@@ -116,12 +127,12 @@ WITH collect({
        name: coalesce(n.name, "(unnamed)"),
        description: coalesce(n.description, ""),
        rank: CASE WHEN n = node AND bestNodeRank < 1.0 THEN 1.0 ELSE bestNodeRank END
-     }) AS nodes, allRels, relRankList
+     }) AS nodes, expanded, allRels, relRankList
 
 // Build relationships with best rank lookup
 UNWIND allRels AS r
-WITH nodes, relRankList, r, startNode(r) AS s, endNode(r) AS e
-WITH nodes,
+WITH nodes, expanded, relRankList, r, startNode(r) AS s, endNode(r) AS e
+WITH nodes, expanded,
      collect({
        id: elementId(r),
        type: type(r),
@@ -133,14 +144,75 @@ WITH nodes,
 
 // Final pruning and ordering
 UNWIND nodes AS n
-WITH n, rels
+WITH n, rels, expanded
 ORDER BY n.rank DESC
-WITH collect(n) AS nodes, rels
+WITH collect(n) AS nodes, rels, expanded
 
 UNWIND rels AS r
-WITH nodes, r
+WITH nodes, r, expanded
 ORDER BY r.rank DESC
-RETURN nodes, collect(r) AS rels
+RETURN nodes, collect(r) AS rels, expanded
+"""
+
+VECTOR_SEED_CYPHER = """
+CALL db.index.vector.queryNodes($vector_index_name, $top_k, $query_vector)
+YIELD node, score
+"""
+
+# Seeds from several per-label indexes; scores share one cosine scale, so the best top_k win overall
+MULTI_VECTOR_SEED_CYPHER = """
+UNWIND $vector_index_names AS vector_index_name
+CALL db.index.vector.queryNodes(vector_index_name, $top_k, $query_vector)
+YIELD node, score
+WITH node, score
+ORDER BY score DESC
+LIMIT $top_k
+"""
+
+CANDIDATE_CYPHER = """
+WITH node, score
+__EXPANSION__
+WITH node, score, collect(p) AS paths
+
+// Unique nodes on candidate paths, with embeddings for client-side scoring
+CALL (paths) {
+  WITH paths
+  UNWIND paths AS p1
+  UNWIND nodes(p1) AS n1
+  WITH DISTINCT n1
+  RETURN collect({
+    id: elementId(n1),
+    labels: labels(n1),
+    name: coalesce(n1.name, "(unnamed)"),
+    description: coalesce(n1.description, ""),
+    embedding: n1.__EMBEDDING__
+  }) AS nodes
+}
+
+// Unique relationships on candidate paths
+CALL (paths) {
+  WITH paths
+  UNWIND paths AS p2
+  UNWIND relationships(p2) AS r2
+  WITH DISTINCT r2
+  RETURN collect({
+    id: elementId(r2),
+    type: type(r2),
+    start: elementId(startNode(r2)),
+    end: elementId(endNode(r2)),
+    description: coalesce(r2.description, "")
+  }) AS rels
+}
+
+RETURN elementId(node) AS seed, score AS seedScore, nodes, rels, size(paths) AS expanded,
+       [p3 IN paths | [n IN nodes(p3) | elementId(n)]] AS pathNodes,
+       [p3 IN paths | [r IN relationships(p3) | elementId(r)]] AS pathRels
+"""
+
+# Stamped by graph_construction's build_database after every build
+GRAPH_VERSION_CYPHER = """
+MATCH (m:GraphMeta {id: 'graph'})
+RETURN m.version AS version
 """
 
 GENERATION_PROMPT = (
@@ -0,0 +1,152 @@
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from neo4j import Driver, Record, RoutingControl
+from neo4j_graphrag.embeddings.openai import OpenAIEmbeddings
+from neo4j_graphrag.types import RetrieverResult, RetrieverResultItem
+
+from prompts import MULTI_VECTOR_SEED_CYPHER, VECTOR_SEED_CYPHER
+
+
+# ---------------- RERANKING RETRIEVER ----------------
+class RerankingRetriever:
+    """
+    Vector-seeded graph retriever that fetches candidate paths with their node embeddings
+    and scores them client-side in NumPy, instead of with reduce() loops in Cypher.
+    Exposes the same `search()` call and formatter contract as `VectorCypherRetriever`.
+    `index_name` may also be a list of per-label vector indexes to seed from jointly.
+    """
+
+    def __init__(self, driver: Driver, index_name: Union[str, List[str]], retrieval_query: str, embedder: Optional[OpenAIEmbeddings] = None, result_formatter: Optional[Callable[[Record], RetrieverResultItem]] = None, neo4j_database: Optional[str] = None) -> None:
+        self.driver = driver
+        self.index_name = index_name
+        self.retrieval_query = retrieval_query
+        self.embedder = embedder
+        self.result_formatter = result_formatter
+        self.neo4j_database = neo4j_database
+
+    def search(self, query_vector: Optional[List[float]] = None, query_text: Optional[str] = None, top_k: int = 5, query_params: Optional[Dict[str, Any]] = None) -> RetrieverResult:
+        if query_vector is None:
+            if query_text is None or self.embedder is None:
+                raise ValueError("Either query_vector or query_text with an embedder is required.")
+            query_vector = self.embedder.embed_query(query_text)
+
+        params = dict(query_params or {})
+        q_embed = params.pop("q_embed", None)
+        if q_embed is None:
+            q_embed = query_vector
+        lam = float(params.pop("lambda", 0.5))
+        per_seed_limit = int(params.pop("per_seed_limit", 10))
+
+        seed_cypher, index_params = seed_query(self.index_name)
+        records, _, _ = self.driver.execute_query(
+            seed_cypher + self.retrieval_query,
+            parameters_={
+                **params,
+                **index_params,
+                "top_k": top_k,
+                "query_vector": query_vector,
+            },
+            database_=self.neo4j_database,
+            routing_=RoutingControl.READ,
+        )
+        ranked = rerank_candidates([rec.data() for rec in records], q_embed, lam, per_seed_limit)
+
+        formatter = self.result_formatter or (lambda rec: RetrieverResultItem(content=str(rec.data())))
+        return RetrieverResult(
+            items=[formatter(Record(rec)) for rec in ranked],
+            metadata={"__retriever": self.__class__.__name__},
+        )
+
+
+def seed_query(index_name: Union[str, List[str]]) -> Tuple[str, Dict[str, Any]]:
+    # Vector seed lookup for one index, or the best seeds across several per-label indexes
+    if isinstance(index_name, str):
+        return VECTOR_SEED_CYPHER, {"vector_index_name": index_name}
+    return MULTI_VECTOR_SEED_CYPHER, {"vector_index_names": list(index_name)}
+
+
+# ---------------- SCORING ----------------
+def rerank_candidates(candidates: List[Dict], q_embed: List[float], lam: float, per_seed_limit: int) -> List[Dict]:
+    """
+    Rank candidate paths per seed exactly like RETRIEVAL_CYPHER:
+    path rank = lambda * seedScore + (1 - lambda) * cos(q, endpoint), top `per_seed_limit` paths kept,
+    node rank = best rank of a kept path through it (seed at least 1.0),
+    relationship rank = mean cosine of its two endpoints.
+    """
+    # Score every distinct node across all seeds with a single matrix product
+    row_of: Dict[str, int] = {}
+    vectors: List[Optional[List[float]]] = []
+    for cand in candidates:
+        for n in cand["nodes"]:
+            if n["id"] not in row_of:
+                row_of[n["id"]] = len(vectors)
+                vectors.append(n.get("embedding"))
+    sims = cosine_similarities(q_embed, vectors)
+
+    ranked = []
+    for cand in candidates:
+        path_nodes = cand["pathNodes"]
+        if not path_nodes:
+            continue
+        seed_score = float(cand["seedScore"])
+
+        ends = np.fromiter((row_of[p[-1]] for p in path_nodes), dtype=np.int64, count=len(path_nodes))
+        path_rank = lam * seed_score + (1 - lam) * sims[ends]
+        keep = np.argsort(-path_rank, kind="stable")[:per_seed_limit]
+
+        node_rank: Dict[str, float] = {}
+        rel_ids = set()
+        for k in keep:
+            rank = float(path_rank[k])
+            for nid in path_nodes[k]:
+                if rank > node_rank.get(nid, float("-inf")):
+                    node_rank[nid] = rank
+            rel_ids.update(cand["pathRels"][k])
+
+        nodes = []
+        for n in cand["nodes"]:
+            if n["id"] not in node_rank:
+                continue
+            rank = node_rank[n["id"]]
+            if n["id"] == cand["seed"] and rank < 1.0:
+                rank = 1.0
+            nodes.append({
+                "id": n["id"],
+                "labels": n["labels"],
+                "name": n["name"],
+                "description": n["description"],
+                "rank": rank,
+            })
+
+        rels = []
+        for r in cand["rels"]:
+            if r["id"] not in rel_ids:
+                continue
+            rank = (sims[row_of[r["start"]]] + sims[row_of[r["end"]]]) / 2.0
+            rels.append({**r, "rank": float(rank)})
+
+        nodes.sort(key=lambda n: n["rank"], reverse=True)
+        rels.sort(key=lambda r: r["rank"], reverse=True)
+        ranked.append({"nodes": nodes, "rels": rels, "expanded": len(path_nodes)})
+    return ranked
+
+def cosine_similarities(q_embed: List[float], vectors: List[Optional[List[float] | bytes]]) -> np.ndarray:
+    # Missing embeddings score 0.0, as the coalesce() fallbacks do in Cypher
+    # int8-quantized embeddings arrive as bytes; their scale cancels out in the cosine
+    vectors = [np.frombuffer(v, dtype=np.int8) if isinstance(v, (bytes, bytearray)) else v for v in vectors]
+    q = np.asarray(q_embed if q_embed is not None else [], dtype=np.float64)
+    sims = np.zeros(len(vectors), dtype=np.float64)
+    q_norm = np.linalg.norm(q)
+    if q_norm == 0 or not vectors:
+        return sims
+
+    rows = [i for i, v in enumerate(vectors) if v is not None and len(v) == len(q)]
+    if not rows:
+        return sims
+    mat = np.asarray([vectors[i] for i in rows], dtype=np.float64)
+    norms = np.linalg.norm(mat, axis=1)
+    dots = mat @ q
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sims[rows] = np.where(norms == 0, 0.0, dots / (norms * q_norm))
+    return sims
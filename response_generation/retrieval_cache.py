@@ -0,0 +1,146 @@
+import hashlib, json, os, shutil, threading, time
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from neo4j import Driver, RoutingControl
+
+from prompts import GRAPH_VERSION_CYPHER
+
+
+# ---------------- RETRIEVAL CACHE ----------------
+class RetrievalCache:
+    """
+    LRU cache of retrieval results keyed by (query embedding, retrieval parameters), shared by every
+    query on the same image. Entries are tied to the graph version stamped by `build_database` and are
+    dropped, in memory and on disk, as soon as a new version is seen.
+    `namespace` should identify the retriever setup (mode, expansion, seeds) so disk entries are not
+    reused across configurations. `version_fn` replaces the Neo4j lookup, e.g. for a graph snapshot.
+    """
+
+    def __init__(self, driver: Optional[Driver], namespace: str = "", max_entries: int = 1024, cache_dir: Optional[str] = None, check_interval: float = 30.0, version_fn: Optional[Callable[[], Optional[str]]] = None) -> None:
+        self.driver = driver
+        self.version_fn = version_fn
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self.version: Optional[str] = None
+        self._checked_at = float("-inf")
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._inflight: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get_or_retrieve(self, query_emb: List[float], params: Dict[str, Any], compute: Callable[[], Any]) -> Tuple[Any, bool]:
+        # Returns (value, cached)
+        self._check_version()
+        key = self.key(query_emb, params)
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                self.hits += 1
+                return value, True
+            inflight = self._inflight.setdefault(key, threading.Lock())
+
+        # Identical concurrent retrievals (e.g. two questions on one image) run once
+        with inflight:
+            with self._lock:
+                value = self._lookup(key)
+                if value is not None:
+                    self.hits += 1
+                    return value, True
+                self.misses += 1
+                version = self.version
+
+            value = compute()
+            with self._lock:
+                if version == self.version:
+                    self._store(key, value)
+                self._inflight.pop(key, None)
+        return value, False
+
+    def key(self, query_emb: List[float], params: Dict[str, Any]) -> str:
+        sha = hashlib.sha256(np.asarray(query_emb, dtype=np.float32).tobytes())
+        sha.update(json.dumps([self.namespace, params], sort_keys=True).encode("utf-8"))
+        return sha.hexdigest()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+            "version": self.version,
+        }
+
+    def _check_version(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        if self.version_fn is not None:
+            version = self.version_fn()
+        else:
+            records, _, _ = self.driver.execute_query(GRAPH_VERSION_CYPHER, routing_=RoutingControl.READ)
+            version = records[0]["version"] if records else None
+        with self._lock:
+            self._checked_at = now
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+                self._prune_disk()
+
+    def _lookup(self, key: str) -> Any:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        path = self._disk_path(key)
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    value = json.load(file)
+            except (OSError, json.JSONDecodeError):
+                return None
+            self._remember(key, value)
+            return value
+        return None
+
+    def _store(self, key: str, value: Any) -> None:
+        self._remember(key, value)
+        path = self._disk_path(key)
+        if not path:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(value, file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _remember(self, key: str, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _prune_disk(self) -> None:
+        # One directory per graph version; only the current one is kept
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return
+        current = self._version_dir()
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if os.path.isdir(path) and path != current:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _version_dir(self) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, self.version or "unversioned")
+
+    def _disk_path(self, key: str) -> Optional[str]:
+        directory = self._version_dir()
+        if not directory:
+            return None
+        return os.path.join(directory, f"{key}.json")
@@ -0,0 +1,171 @@
+import json, os
+import numpy as np
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from neo4j import Record
+from neo4j_graphrag.embeddings.openai import OpenAIEmbeddings
+from neo4j_graphrag.types import RetrieverResult, RetrieverResultItem
+
+from rerank import rerank_candidates
+
+
+# ---------------- SNAPSHOT RETRIEVER ----------------
+class SnapshotRetriever:
+    """
+    In-process retriever over the CSR/NumPy snapshot written by graph_construction's `export_snapshot`.
+    Seed top-k, bounded path expansion to Myth nodes and lambda-weighted scoring all run locally on
+    memory-mapped arrays, with no Neo4j round trip; items match the Cypher retrievers' formatter text.
+    `seed_labels=None` seeds from every label (paths may then start at zero hops, like multi-index seeding).
+    """
+
+    def __init__(self, snapshot_dir: str, seed_labels: Optional[List[str]] = None, max_hops: int = 3, expansion: str = "shortest", embedder: Optional[OpenAIEmbeddings] = None, result_formatter: Optional[Callable[[Record], RetrieverResultItem]] = None) -> None:
+        if expansion not in ("shortest", "all"):
+            raise ValueError(f"Unsupported expansion strategy: {expansion}")
+        self.max_hops = max_hops
+        self.expansion = expansion
+        self.embedder = embedder
+        self.result_formatter = result_formatter
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(snapshot_dir, f"{name}.npy"), mmap_mode="r")
+
+        with open(os.path.join(snapshot_dir, "meta.json"), "r", encoding="utf-8") as file:
+            meta = json.load(file)
+        with open(os.path.join(snapshot_dir, "nodes.json"), "r", encoding="utf-8") as file:
+            self.nodes: List[Dict] = json.load(file)
+        with open(os.path.join(snapshot_dir, "edges.json"), "r", encoding="utf-8") as file:
+            self.edges: List[Dict] = json.load(file)
+        self.version = meta["version"]
+        self.labels: List[str] = meta["labels"]
+        self.rel_types: List[str] = meta["rel_types"]
+
+        self.embeddings = load("embeddings")
+        self.node_labels = load("node_labels")
+        self.indptr = load("indptr")
+        self.indices = load("indices")
+        self.edge_types = load("edge_types")
+        self.norms = np.linalg.norm(self.embeddings, axis=1)
+
+        seed_codes = range(len(self.labels)) if seed_labels is None else [self.labels.index(l) for l in seed_labels]
+        # Nodes without an embedding (zero rows) are never returned by Neo4j's vector index, so never seed from them
+        self.seed_mask = np.isin(self.node_labels, list(seed_codes)) & (self.norms > 0)
+        self.min_hops = 0 if seed_labels is None or len(seed_labels) > 1 else 1
+        self.myth = self.labels.index("Myth")
+
+    def search(self, query_vector: Optional[List[float]] = None, query_text: Optional[str] = None, top_k: int = 5, query_params: Optional[Dict[str, Any]] = None) -> RetrieverResult:
+        if query_vector is None:
+            if query_text is None or self.embedder is None:
+                raise ValueError("Either query_vector or query_text with an embedder is required.")
+            query_vector = self.embedder.embed_query(query_text)
+
+        params = dict(query_params or {})
+        q_embed = params.get("q_embed")
+        if q_embed is None:
+            q_embed = query_vector
+        lam = float(params.get("lambda", 0.5))
+        per_seed_limit = int(params.get("per_seed_limit", 10))
+        max_paths = int(params.get("max_paths", 200))
+
+        candidates = [
+            self.candidate(seed, score, max_paths)
+            for seed, score in self.seeds(query_vector, top_k)
+        ]
+        ranked = rerank_candidates(candidates, q_embed, lam, per_seed_limit)
+
+        formatter = self.result_formatter or (lambda rec: RetrieverResultItem(content=str(rec.data())))
+        return RetrieverResult(
+            items=[formatter(Record(rec)) for rec in ranked],
+            metadata={"__retriever": self.__class__.__name__},
+        )
+
+    def seeds(self, query_vector: List[float], top_k: int) -> List[tuple]:
+        # Exact top-k over the seed labels, scored like Neo4j's cosine vector index: (1 + cos) / 2
+        q = np.asarray(query_vector, dtype=np.float32)
+        q_norm = float(np.linalg.norm(q)) or 1.0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cos = np.where(self.norms == 0, 0.0, (self.embeddings @ q) / (self.norms * q_norm))
+        scores = np.where(self.seed_mask, (1.0 + cos) / 2.0, -np.inf)
+        k = min(top_k, int(self.seed_mask.sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(row), float(scores[row])) for row in top]
+
+    def candidate(self, seed: int, score: float, max_paths: int) -> Dict:
+        # Same shape as a CANDIDATE_CYPHER record
+        paths = self.expand_shortest(seed) if self.expansion == "shortest" else self.expand_all(seed)
+        path_nodes, path_edges = [], []
+        for nodes, edges in paths:
+            if len(path_nodes) >= max_paths:
+                break
+            path_nodes.append(nodes)
+            path_edges.append(edges)
+
+        node_rows = list(dict.fromkeys(row for p in path_nodes for row in p))
+        edge_rows = list(dict.fromkeys(pos for p in path_edges for pos in p))
+        return {
+            "seed": self.nodes[seed]["id"],
+            "seedScore": score,
+            "nodes": [{
+                "id": self.nodes[row]["id"],
+                "labels": [self.labels[self.node_labels[row]]],
+                "name": self.nodes[row]["name"],
+                "description": self.nodes[row]["description"],
+                "embedding": self.embeddings[row],
+            } for row in node_rows],
+            "rels": [self.rel(pos) for pos in edge_rows],
+            "expanded": len(path_nodes),
+            "pathNodes": [[self.nodes[row]["id"] for row in p] for p in path_nodes],
+            "pathRels": [[self.edges[pos]["id"] for pos in p] for p in path_edges],
+        }
+
+    def expand_shortest(self, seed: int) -> Iterator[tuple]:
+        # Breadth-first: one shortest path to each Myth within max_hops
+        parent: Dict[int, Optional[tuple]] = {seed: None}
+        frontier = deque([(seed, 0)])
+        while frontier:
+            row, depth = frontier.popleft()
+            if depth >= self.min_hops and self.node_labels[row] == self.myth:
+                yield self.trace(parent, row)
+            if depth == self.max_hops:
+                continue
+            for pos in range(self.indptr[row], self.indptr[row + 1]):
+                nbr = int(self.indices[pos])
+                if nbr not in parent:
+                    parent[nbr] = (row, pos)
+                    frontier.append((nbr, depth + 1))
+
+    def expand_all(self, seed: int) -> Iterator[tuple]:
+        # Breadth-first: every path to a Myth within max_hops that repeats no relationship,
+        # shortest first so max_paths keeps the shortest ones (like the Cypher ORDER BY length(p))
+        queue = deque([(seed, [seed], [])])
+        while queue:
+            row, nodes, edges = queue.popleft()
+            if len(edges) >= self.min_hops and self.node_labels[row] == self.myth:
+                yield nodes, edges
+            if len(edges) == self.max_hops:
+                continue
+            for pos in range(self.indptr[row], self.indptr[row + 1]):
+                if pos not in edges:
+                    nbr = int(self.indices[pos])
+                    queue.append((nbr, nodes + [nbr], edges + [pos]))
+
+    def trace(self, parent: Dict[int, Optional[tuple]], row: int) -> tuple:
+        nodes, edges = [row], []
+        while parent[row] is not None:
+            row, pos = parent[row]
+            nodes.append(row)
+            edges.append(pos)
+        return nodes[::-1], edges[::-1]
+
+    def rel(self, pos: int) -> Dict:
+        start = int(np.searchsorted(self.indptr, pos, side="right") - 1)
+        return {
+            "id": self.edges[pos]["id"],
+            "type": self.rel_types[self.edge_types[pos]],
+            "start": self.nodes[start]["id"],
+            "end": self.nodes[int(self.indices[pos])]["id"],
+            "description": self.edges[pos]["description"],
+        }